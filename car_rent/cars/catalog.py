@@ -0,0 +1,168 @@
+import threading
+import time
+from bisect import bisect_left
+
+from core.cache import get_version
+from core.media import MediaURLResolver
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection, transaction
+from django.db.models import F, Value
+
+from .models import Brand, CarModel
+from .utils import CATALOG_CACHE_NAMESPACE
+
+BRAND = 'brand'
+CAR_MODEL = 'car_model'
+# pg_trgm defaults to 0.6 for word similarity, which misses ordinary
+# typos like "tayota" (0.43), 0.3 is the default of plain similarity
+WORD_SIMILARITY_THRESHOLD = 0.3
+
+
+class PrefixIndex:
+    '''
+    Sorted array of lowercased titles pointing to catalog suggestions.
+    Car models are indexed by their own title and by "brand model",
+    so both "cam" and "toyota cam" find Camry.
+    '''
+
+    def __init__(self, suggestions):
+        self.suggestions = suggestions
+        self.by_key = {(item['type'], item['id']): item for item in suggestions}
+        keys = []
+        for position, item in enumerate(suggestions):
+            keys.append((item['title'].casefold(), position))
+            if item['type'] == CAR_MODEL:
+                keys.append((f"{item['brand_title']} {item['title']}".casefold(), position))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.positions = [position for _, position in keys]
+
+    def search(self, prefix, limit):
+        prefix = ' '.join(prefix.casefold().split())
+        result = []
+        seen = set()
+        index = bisect_left(self.keys, prefix)
+        while index < len(self.keys) and len(result) < limit and self.keys[index].startswith(prefix):
+            position = self.positions[index]
+            if position not in seen:
+                seen.add(position)
+                result.append(self.suggestions[position])
+            index += 1
+        return result
+
+    def get(self, suggestion_type, pk):
+        return self.by_key.get((suggestion_type, pk))
+
+
+def _first_photo_name(photos):
+    return photos[0].photo.name if photos else None
+
+
+def build_index():
+    '''
+    Loads the whole catalog, photos are fetched with one query per model
+    and their URLs are resolved in one batch
+    '''
+    suggestions = []
+    for brand in Brand.objects.prefetch_related('brand_photo'):
+        suggestions.append({
+            'id': brand.id,
+            'title': brand.title,
+            'type': BRAND,
+            'brand_id': brand.id,
+            'brand_title': brand.title,
+            'photo': _first_photo_name(brand.brand_photo.all()),
+        })
+    for car_model in CarModel.objects.select_related('brand').prefetch_related('carmodel_photo'):
+        suggestions.append({
+            'id': car_model.id,
+            'title': car_model.title,
+            'type': CAR_MODEL,
+            'brand_id': car_model.brand_id,
+            'brand_title': car_model.brand.title,
+            'photo': _first_photo_name(car_model.carmodel_photo.all()),
+        })
+    # the index keeps URLs up to CATALOG_INDEX_MAX_AGE, they must outlive it
+    resolver = MediaURLResolver(min_lifetime=settings.CATALOG_INDEX_MAX_AGE)
+    resolver.resolve((item['photo'] for item in suggestions), public=True)
+    for item in suggestions:
+        if item['photo']:
+            item['photo'] = resolver.url(item['photo'], public=True)
+    return PrefixIndex(suggestions)
+
+
+class CatalogIndexHolder:
+    '''
+    Per process copy of the prefix index. It is built lazily and
+    rebuilt once the catalog version in the shared cache changes, the
+    version itself is checked at most every CATALOG_INDEX_CHECK_INTERVAL
+    seconds. CATALOG_INDEX_MAX_AGE bounds the age of stored photo URLs.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.built_at = 0.0
+        self.checked_at = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        if self.index is not None and now - self.checked_at < settings.CATALOG_INDEX_CHECK_INTERVAL:
+            return self.index
+        with self.lock:
+            version = get_version(CATALOG_CACHE_NAMESPACE)
+            self.checked_at = now
+            if (self.index is None or version != self.version
+                    or now - self.built_at >= settings.CATALOG_INDEX_MAX_AGE):
+                self.index = build_index()
+                self.version = version
+                self.built_at = now
+            return self.index
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+
+
+catalog_index = CatalogIndexHolder()
+
+
+def fuzzy_autocomplete(query, limit):
+    '''
+    Brands and car models whose title matches the typed text,
+    best matches first. Both parts are served by the trigram GIN
+    indexes and combined with UNION ALL into a single query.
+    '''
+    # UNION matches columns by position and values() puts model fields
+    # before annotations, so brand_id has to precede type in both parts
+    brands = Brand.objects.filter(title__trigram_word_similar=query).annotate(
+        type=Value(BRAND),
+        brand_id=F('id'),
+        brand_title=F('title'),
+        similarity=TrigramWordSimilarity(query, 'title'),
+    ).order_by().values('id', 'title', 'brand_id', 'type', 'brand_title', 'similarity')
+    car_models = CarModel.objects.filter(title__trigram_word_similar=query).annotate(
+        type=Value(CAR_MODEL),
+        brand_title=F('brand__title'),
+        similarity=TrigramWordSimilarity(query, 'title'),
+    ).order_by().values('id', 'title', 'brand_id', 'type', 'brand_title', 'similarity')
+    with transaction.atomic(), connection.cursor() as cursor:
+        # the operator keeps using the GIN indexes, unlike a comparison of the similarity
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                       [str(WORD_SIMILARITY_THRESHOLD)])
+        return list(brands.union(car_models, all=True).order_by('-similarity', 'title')[:limit])
+
+
+def autocomplete(query, limit):
+    '''
+    Prefix matches from the in-process index, the trigram search in
+    Postgres is used only for typos when nothing starts with the query
+    '''
+    index = catalog_index.get()
+    suggestions = index.search(query, limit)
+    if suggestions:
+        return suggestions
+    found = (index.get(item['type'], item['id']) for item in fuzzy_autocomplete(query, limit))
+    return [item for item in found if item is not None]
@@ -94,3 +94,29 @@ class CAR_STATUS_CHOICES(Choices):
         (ARCHIVED, 'Архивировано'),
         (BANNED, 'Заблокировано'),
     )
+
+
+class PHOTO_VARIANTS_STATUS_CHOICES(Choices):
+    '''Choices of photo variants pipeline status'''
+    PENDING = 100
+    PROCESSING = 200
+    READY = 300
+    FAILED = 400
+
+    CHOICES = (
+        (PENDING, 'Ожидает обработки'),
+        (PROCESSING, 'Обрабатывается'),
+        (READY, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+
+class FLEET_IMPORT_FORMAT_CHOICES(Choices):
+    '''Choices of fleet import file format'''
+    CSV = 'csv'
+    JSON_LINES = 'json'
+
+    CHOICES = (
+        (CSV, 'CSV'),
+        (JSON_LINES, 'JSON Lines или массив JSON'),
+    )
@@ -1,11 +1,37 @@
+from django import forms
+from django.contrib.postgres.fields.ranges import DateTimeTZRange
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
+from django_filters.fields import IsoDateTimeRangeField
+from orders.choices import ORDER_STATUSES
+from orders.models import Order
 
-from .models import Brand, CarModel
+from .choices import (BODY_TYPE_CHOCIES, DRIVE_CHOICES, FUEL_TYPE_CHOICES,
+                      GEARBOX_CHOICES)
+from .models import Brand, Car, CarModel
+from .utils import in_viewport
+
+
+class PeriodField(IsoDateTimeRangeField):
+    '''ISO 8601 datetime range whose start is not after its stop'''
+
+    def compress(self, data_list):
+        value = super().compress(data_list)
+        if value is not None and value.start and value.stop and value.start > value.stop:
+            raise forms.ValidationError('Начало периода должно быть не позже его окончания')
+        return value
+
+
+class PeriodFilter(filters.IsoDateTimeFromToRangeFilter):
+    '''Range filter that rejects periods with reversed bounds'''
+    field_class = PeriodField
 
 
 class BaseCarsFilterset(filters.FilterSet):
     '''Base fiterset of cars'''
     title = filters.CharFilter(field_name='title', lookup_expr='istartswith')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         abstract = True
@@ -13,6 +39,11 @@ class BaseCarsFilterset(filters.FilterSet):
             'title',
         ]
 
+    def filter_search(self, queryset, name, value):
+        '''Typo tolerant search over the trigram index, most similar first'''
+        return queryset.filter(title__trigram_similar=value).annotate(
+            similarity=TrigramSimilarity('title', value)).order_by('-similarity', 'title')
+
 
 class BrandFilterset(BaseCarsFilterset):
     '''Filterset for brands'''
@@ -30,3 +61,82 @@ class CarModelFilterset(BaseCarsFilterset):
         fields = [
             'title',
         ]
+
+
+class CarFilterset(filters.FilterSet):
+    '''Filterset for cars'''
+    min_price = filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = filters.NumberFilter(field_name='price', lookup_expr='lte')
+    brand = filters.NumberFilter(field_name='car_model__brand')
+    car_model = filters.NumberFilter(field_name='car_model')
+    body_type = filters.MultipleChoiceFilter(
+        field_name='car_model__body_type', choices=BODY_TYPE_CHOCIES)
+    gearbox = filters.MultipleChoiceFilter(
+        field_name='car_model__gearbox', choices=GEARBOX_CHOICES)
+    type_of_fuel = filters.MultipleChoiceFilter(
+        field_name='car_model__type_of_fuel', choices=FUEL_TYPE_CHOICES)
+    drive = filters.MultipleChoiceFilter(
+        field_name='car_model__drive', choices=DRIVE_CHOICES)
+    min_hp = filters.NumberFilter(field_name='car_model__hp', lookup_expr='gte')
+    max_hp = filters.NumberFilter(field_name='car_model__hp', lookup_expr='lte')
+    available = PeriodFilter(method='filter_available')
+
+    class Meta:
+        model = Car
+        fields = [
+            'min_price',
+            'max_price',
+            'brand',
+            'car_model',
+            'body_type',
+            'gearbox',
+            'type_of_fuel',
+            'drive',
+            'min_hp',
+            'max_hp',
+            'available',
+        ]
+
+    def filter_available(self, queryset, name, value):
+        '''Excludes cars having active orders that overlap the period'''
+        period = DateTimeTZRange(value.start, value.stop)
+        return queryset.exclude(Exists(Order.objects.filter(
+            car=OuterRef('pk'),
+            status__in=ORDER_STATUSES.ACTIVE,
+            desired_period__overlap=period,
+        )))
+
+
+class CarMapFilterset(CarFilterset):
+    '''Filterset for cars on the map, limits cars to the visible viewport'''
+    min_lat = filters.NumberFilter(method='filter_viewport')
+    max_lat = filters.NumberFilter(method='filter_viewport')
+    min_lon = filters.NumberFilter(method='filter_viewport')
+    max_lon = filters.NumberFilter(method='filter_viewport')
+
+    class Meta:
+        model = Car
+        fields = CarFilterset.Meta.fields + [
+            'min_lat',
+            'max_lat',
+            'min_lon',
+            'max_lon',
+        ]
+
+    def filter_viewport(self, queryset, name, value):
+        '''The bounds are applied together in filter_queryset'''
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        bounds = [data.get(name) for name in ('min_lat', 'max_lat', 'min_lon', 'max_lon')]
+        if all(bound is None for bound in bounds):
+            return queryset
+        min_lat, max_lat, min_lon, max_lon = (
+            float(bound) if bound is not None else default
+            for bound, default in zip(bounds, (-90.0, 90.0, -180.0, 180.0))
+        )
+        if min_lat > max_lat:
+            return queryset.none()
+        return queryset.filter(in_viewport(min_lat, max_lat, min_lon, max_lon))
@@ -0,0 +1,170 @@
+import codecs
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .choices import FLEET_IMPORT_FORMAT_CHOICES
+from .models import Car, CarModel, CarOption
+from .serializers.serializers import FleetImportRowSerializer
+from .utils import encode_geohash
+
+FLEET_IMPORT_EXTENSIONS = {
+    '.csv': FLEET_IMPORT_FORMAT_CHOICES.CSV,
+    '.json': FLEET_IMPORT_FORMAT_CHOICES.JSON_LINES,
+    '.jsonl': FLEET_IMPORT_FORMAT_CHOICES.JSON_LINES,
+    '.ndjson': FLEET_IMPORT_FORMAT_CHOICES.JSON_LINES,
+}
+# options of a car are written in one CSV cell
+CSV_OPTIONS_SEPARATOR = '|'
+FLEET_IMPORT_SALT = 'cars.fleet_import'
+
+
+def read_csv(lines):
+    '''Rows of CSV with header as (line number, dict), empty cells are dropped'''
+    reader = csv.DictReader(lines)
+    for row in reader:
+        data = {key: value.strip() for key, value in row.items()
+                if key is not None and value is not None and value.strip()}
+        if 'options' in data:
+            data['options'] = [
+                option.strip() for option in data['options'].split(CSV_OPTIONS_SEPARATOR) if option.strip()]
+        yield reader.line_num, data
+
+
+def read_json_array(text):
+    '''Rows of a JSON array as (position in the array, dict or None), raises ValueError'''
+    rows = json.loads(text)
+    for number, row in enumerate(rows, start=1):
+        yield number, row if isinstance(row, dict) else None
+
+
+def read_json_lines(lines):
+    '''
+    Rows of JSON Lines (one object per line) as (line number, dict or None).
+    A file starting with "[" is an ordinary JSON array and is read whole.
+    '''
+    lines = iter(lines)
+    first = True
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if first and line.lstrip().startswith('['):
+            yield from read_json_array(line + ''.join(lines))
+            return
+        first = False
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def detect_format(name):
+    '''Format by the file extension, None if it is unknown'''
+    return FLEET_IMPORT_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+
+
+def read_rows(file, file_format):
+    '''Rows of the uploaded or stored file, read line by line'''
+    lines = codecs.iterdecode(file, 'utf-8-sig')
+    if file_format == FLEET_IMPORT_FORMAT_CHOICES.CSV:
+        return read_csv(lines)
+    return read_json_lines(lines)
+
+
+def car_model_lookup():
+    '''Every car model by id and by (brand title, model title), one query'''
+    by_id, by_title = set(), {}
+    for pk, brand_title, title in CarModel.objects.values_list('id', 'brand__title', 'title'):
+        by_id.add(pk)
+        by_title[(brand_title.casefold(), title.casefold())] = pk
+    return by_id, by_title
+
+
+def create_cars(owner, batch):
+    '''Inserts a batch of validated rows, bulk_create skips save() so geohash is set here'''
+    cars = [
+        Car(
+            owner=owner,
+            car_model_id=attrs['car_model'],
+            color=attrs['color'],
+            price=attrs['price'],
+            latitude=attrs['latitude'],
+            longitude=attrs['longitude'],
+            geohash=encode_geohash(attrs['latitude'], attrs['longitude']),
+        )
+        for attrs in batch
+    ]
+    with transaction.atomic():
+        Car.objects.bulk_create(cars)
+        CarOption.objects.bulk_create([
+            CarOption(car=car, option=option)
+            for car, attrs in zip(cars, batch)
+            for option in attrs['options']
+        ])
+    return len(cars)
+
+
+def import_fleet(owner, rows, batch_size=None, on_progress=None):
+    '''
+    Validates rows and creates cars of the owner in batches of
+    FLEET_IMPORT_BATCH_SIZE. Invalid rows are skipped and reported by line
+    number, at most FLEET_IMPORT_MAX_ERRORS of them are listed.
+    on_progress(processed rows) is called after every batch.
+    '''
+    batch_size = batch_size or settings.FLEET_IMPORT_BATCH_SIZE
+    row_serializer = FleetImportRowSerializer()
+    model_ids, models_by_title = car_model_lookup()
+    report = {'total': 0, 'created': 0, 'failed': 0, 'errors': [], 'error': None}
+
+    def fail(number, errors):
+        report['failed'] += 1
+        if len(report['errors']) < settings.FLEET_IMPORT_MAX_ERRORS:
+            report['errors'].append({'row': number, 'errors': errors})
+
+    batch = []
+    try:
+        for number, row in rows:
+            report['total'] += 1
+            if row is None:
+                fail(number, {'non_field_errors': ['Строка не является JSON объектом']})
+                continue
+            try:
+                attrs = row_serializer.run_validation(row)
+            except ValidationError as exc:
+                fail(number, exc.detail)
+                continue
+            if 'car_model' in attrs:
+                car_model = attrs['car_model'] if attrs['car_model'] in model_ids else None
+            else:
+                car_model = models_by_title.get((attrs['brand'].casefold(), attrs['model'].casefold()))
+            if car_model is None:
+                fail(number, {'car_model': ['Модель автомобиля не найдена']})
+                continue
+            batch.append({**attrs, 'car_model': car_model})
+            if len(batch) >= batch_size:
+                report['created'] += create_cars(owner, batch)
+                batch = []
+                if on_progress is not None:
+                    on_progress(report['total'])
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error) as exc:
+        report['error'] = f'Не удалось прочитать файл: {exc}'
+    if batch:
+        report['created'] += create_cars(owner, batch)
+    if on_progress is not None:
+        on_progress(report['total'])
+    return report
+
+
+def sign_fleet_import(task_id, owner_id):
+    return signing.dumps({'task': task_id, 'owner': owner_id}, salt=FLEET_IMPORT_SALT)
+
+
+def load_fleet_import(token):
+    '''Returns {"task": id, "owner": id} of the queued import, raises signing.BadSignature'''
+    return signing.loads(token, salt=FLEET_IMPORT_SALT)
@@ -0,0 +1,31 @@
+from cars.models import Car
+from cars.utils import encode_geohash
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Fills geohash of cars in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of cars updated per query')
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute geohash for every car, not only empty ones')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Car.objects.only('id', 'latitude', 'longitude').order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(geohash='')
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for car in batch:
+                car.geohash = encode_geohash(car.latitude, car.longitude)
+            Car.objects.bulk_update(batch, ['geohash'])
+            last_id = batch[-1].id
+            updated += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Updated geohash of {updated} cars'))
@@ -0,0 +1,60 @@
+from cars.choices import PHOTO_VARIANTS_STATUS_CHOICES
+from cars.models import BrandPhoto, CarModelPhoto, CarPhoto
+from cars.tasks import build_photo_variants
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+PHOTO_MODELS = {
+    'brand': BrandPhoto,
+    'car_model': CarModelPhoto,
+    'car': CarPhoto,
+}
+
+
+class Command(BaseCommand):
+    help = 'Builds variants of existing photos in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=PHOTO_MODELS, action='append',
+                            help='Photo model to process, all models by default')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of photos read per query')
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild variants of every photo, not only pending and failed ones')
+        parser.add_argument('--sync', action='store_true',
+                            help='Build variants in this process instead of queueing celery tasks')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for key in options['model'] or PHOTO_MODELS:
+            model = PHOTO_MODELS[key]
+            queryset = model.objects.order_by('id')
+            if not options['all']:
+                queryset = queryset.exclude(
+                    variants_status__in=(PHOTO_VARIANTS_STATUS_CHOICES.READY,
+                                         PHOTO_VARIANTS_STATUS_CHOICES.PROCESSING))
+            last_id = 0
+            processed = 0
+            while True:
+                ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                for pk in ids:
+                    if options['sync']:
+                        build_photo_variants.apply(args=(model._meta.label, pk))
+                    else:
+                        build_photo_variants.delay(model._meta.label, pk)
+                last_id = ids[-1]
+                processed += len(ids)
+            action = 'Built' if options['sync'] else 'Queued'
+            self.stdout.write(self.style.SUCCESS(
+                f'{action} variants of {processed} {model._meta.model_name} photos'))
+        self.print_status()
+
+    def print_status(self):
+        statuses = PHOTO_VARIANTS_STATUS_CHOICES.as_dict()
+        for model in PHOTO_MODELS.values():
+            counts = dict(model.objects.values_list('variants_status').annotate(
+                count=Count('id')).order_by())
+            summary = ', '.join(f'{title}: {counts.get(value, 0)}' for value, title in statuses.items())
+            self.stdout.write(f'{model._meta.model_name}: {summary}')
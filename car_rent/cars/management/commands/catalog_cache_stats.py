@@ -0,0 +1,24 @@
+from cars.utils import CATALOG_CACHE_NAMESPACE
+from core.cache import bump_version, get_stats, reset_stats
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss statistics of the brand and car model response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset hit/miss counters after printing them')
+        parser.add_argument('--invalidate', action='store_true',
+                            help='Bump the catalog version, dropping cached responses')
+
+    def handle(self, *args, **options):
+        if options['invalidate']:
+            bump_version(CATALOG_CACHE_NAMESPACE)
+        stats = get_stats(CATALOG_CACHE_NAMESPACE)
+        self.stdout.write(
+            f"version={stats['version']} hits={stats['hits']} misses={stats['misses']} "
+            f"hit_ratio={stats['hit_ratio']:.2%}"
+        )
+        if options['reset']:
+            reset_stats(CATALOG_CACHE_NAMESPACE)
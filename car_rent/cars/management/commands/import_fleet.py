@@ -0,0 +1,33 @@
+from cars.choices import FLEET_IMPORT_FORMAT_CHOICES
+from cars.fleet_import import detect_format, import_fleet, read_rows
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Imports cars of the owner from CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file')
+        parser.add_argument('--owner', required=True, help='Username of the owner of imported cars')
+        parser.add_argument('--format', choices=FLEET_IMPORT_FORMAT_CHOICES.values(),
+                            help='File format, detected by extension by default')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Number of cars inserted per query')
+
+    def handle(self, *args, **options):
+        try:
+            owner = get_user_model().objects.get(username=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["owner"]} does not exist')
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError('Unknown file format, pass --format')
+        with open(options['path'], 'rb') as file:
+            report = import_fleet(owner, read_rows(file, file_format), batch_size=options['batch_size'])
+        for error in report['errors']:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        if report['error']:
+            self.stderr.write(report['error'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report["created"]} of {report["total"]} cars, {report["failed"]} failed'))
@@ -1,4 +1,7 @@
 from django.db import models
+from django.utils import timezone
+
+from .choices import CAR_STATUS_CHOICES
 
 
 class OrderingManager(models.Manager):
@@ -6,3 +9,35 @@ class OrderingManager(models.Manager):
 
     def get_queryset(self):
         return super().get_queryset().order_by('title')
+
+
+class OwnedQuerySet(models.QuerySet):
+    '''QuerySet scoped to objects the user may change, admins see everything'''
+    owner_lookup = 'owner_id'
+
+    def owned_by(self, user):
+        if user.is_staff:
+            return self
+        return self.filter(**{self.owner_lookup: user.id})
+
+
+class CarQuerySet(OwnedQuerySet):
+    '''QuerySet of cars with visibility rules'''
+
+    def visible_to(self, user):
+        '''Verified cars, plus own cars for the owner'''
+        if user.is_staff:
+            return self
+        condition = models.Q(status=CAR_STATUS_CHOICES.VERIFIED)
+        if user.is_authenticated:
+            condition |= models.Q(owner_id=user.id)
+        return self.filter(condition)
+
+    def touch(self):
+        '''Bumps updated_at, e.g. after changing photos or options'''
+        return self.update(updated_at=timezone.now())
+
+
+class CarRelatedQuerySet(OwnedQuerySet):
+    '''QuerySet of objects attached to a car'''
+    owner_lookup = 'car__owner_id'
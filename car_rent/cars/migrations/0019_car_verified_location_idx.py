@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:20
+
+import cars.utils
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0018_alter_carphoto_photo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=django.contrib.postgres.indexes.GistIndex(cars.utils.GeoPoint(models.F('longitude'), models.F('latitude')), condition=models.Q(('status', 200)), name='car_verified_location_idx'),
+        ),
+    ]
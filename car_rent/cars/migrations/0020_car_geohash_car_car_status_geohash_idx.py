@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0019_car_verified_location_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12, verbose_name='Геохеш'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['status', 'geohash'], name='car_status_geohash_idx', opclasses=['int2_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0020_car_geohash_car_car_status_geohash_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('status', 200)), fields=['created_at', 'id'], name='car_verified_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('status', 200)), fields=['price', 'id'], name='car_verified_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='car_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0021_car_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('status', 200)), fields=['car_model', 'price'], name='car_verified_model_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['body_type', 'gearbox'], name='carmodel_body_gearbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['type_of_fuel', 'drive'], name='carmodel_fuel_drive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['brand', 'hp'], name='carmodel_brand_hp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['hp'], name='carmodel_hp_idx'),
+        ),
+    ]
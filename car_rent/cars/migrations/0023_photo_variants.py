@@ -0,0 +1,45 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:09
+
+import core.types
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0022_car_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brandphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Варианты'),
+        ),
+        migrations.AddField(
+            model_name='brandphoto',
+            name='variants_status',
+            field=core.types.StatusField(choices=[(100, 'Ожидает обработки'), (200, 'Обрабатывается'), (300, 'Готово'), (400, 'Ошибка')], default=100, validators=[django.core.validators.MinValueValidator(100), django.core.validators.MaxValueValidator(999)], verbose_name='Статус вариантов'),
+        ),
+        migrations.AddField(
+            model_name='carmodelphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Варианты'),
+        ),
+        migrations.AddField(
+            model_name='carmodelphoto',
+            name='variants_status',
+            field=core.types.StatusField(choices=[(100, 'Ожидает обработки'), (200, 'Обрабатывается'), (300, 'Готово'), (400, 'Ошибка')], default=100, validators=[django.core.validators.MinValueValidator(100), django.core.validators.MaxValueValidator(999)], verbose_name='Статус вариантов'),
+        ),
+        migrations.AddField(
+            model_name='carphoto',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Варианты'),
+        ),
+        migrations.AddField(
+            model_name='carphoto',
+            name='variants_status',
+            field=core.types.StatusField(choices=[(100, 'Ожидает обработки'), (200, 'Обрабатывается'), (300, 'Готово'), (400, 'Ошибка')], default=100, validators=[django.core.validators.MinValueValidator(100), django.core.validators.MaxValueValidator(999)], verbose_name='Статус вариантов'),
+        ),
+    ]
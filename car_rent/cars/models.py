@@ -1,13 +1,15 @@
 from core.models import BaseAbstractModel
 from core.types import StatusField
 from django.contrib.auth import get_user_model
-from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import GinIndex, GistIndex
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from .choices import (BODY_TYPE_CHOCIES, CAR_STATUS_CHOICES, DRIVE_CHOICES,
-                      FUEL_TYPE_CHOICES, GEARBOX_CHOICES)
-from .managers import OrderingManager
+                      FUEL_TYPE_CHOICES, GEARBOX_CHOICES,
+                      PHOTO_VARIANTS_STATUS_CHOICES)
+from .managers import CarQuerySet, CarRelatedQuerySet, OrderingManager
+from .utils import car_location, encode_geohash
 
 User = get_user_model()
 
@@ -59,7 +61,13 @@ class CarModel(models.Model):
         verbose_name_plural = 'Модели'
         indexes = [
             GinIndex(fields=['title',], name='carmodel_title_gin_idx', opclasses=[
-                     'gin_trgm_ops'])
+                     'gin_trgm_ops']),
+            models.Index(fields=['body_type', 'gearbox'],
+                         name='carmodel_body_gearbox_idx'),
+            models.Index(fields=['type_of_fuel', 'drive'],
+                         name='carmodel_fuel_drive_idx'),
+            models.Index(fields=['brand', 'hp'], name='carmodel_brand_hp_idx'),
+            models.Index(fields=['hp'], name='carmodel_hp_idx'),
         ]
 
     def __str__(self):
@@ -80,6 +88,41 @@ class Car(BaseAbstractModel):
                          default=CAR_STATUS_CHOICES.NOT_VERIFIED)
     latitude = models.FloatField(verbose_name='Широта')
     longitude = models.FloatField(verbose_name='Долгота')
+    geohash = models.CharField(
+        max_length=12, blank=True, default='', editable=False, verbose_name='Геохеш')
+
+    objects = CarQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GistIndex(car_location(), name='car_verified_location_idx',
+                      condition=models.Q(status=CAR_STATUS_CHOICES.VERIFIED)),
+            models.Index(fields=['status', 'geohash'], name='car_status_geohash_idx',
+                         opclasses=['int2_ops', 'varchar_pattern_ops']),
+            models.Index(fields=['created_at', 'id'], name='car_verified_created_idx',
+                         condition=models.Q(status=CAR_STATUS_CHOICES.VERIFIED)),
+            models.Index(fields=['price', 'id'], name='car_verified_price_idx',
+                         condition=models.Q(status=CAR_STATUS_CHOICES.VERIFIED)),
+            models.Index(fields=['car_model', 'price'], name='car_verified_model_price_idx',
+                         condition=models.Q(status=CAR_STATUS_CHOICES.VERIFIED)),
+            models.Index(fields=['owner', 'created_at', 'id'],
+                         name='car_owner_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # lets post_save receivers tell whether the owner was changed
+        instance._loaded_owner_id = instance.__dict__.get('owner_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
 
 
 class CarOption(models.Model):
@@ -88,8 +131,21 @@ class CarOption(models.Model):
                             related_name='car_option')
     option = models.CharField(max_length=200)
 
+    objects = CarRelatedQuerySet.as_manager()
 
-class CarModelPhoto(models.Model):
+
+class BasePhoto(models.Model):
+    '''Photo with resized variants built by cars.tasks.build_photo_variants'''
+    variants = models.JSONField(default=dict, blank=True, verbose_name='Варианты')
+    variants_status = StatusField(
+        choices=PHOTO_VARIANTS_STATUS_CHOICES, default=PHOTO_VARIANTS_STATUS_CHOICES.PENDING,
+        verbose_name='Статус вариантов')
+
+    class Meta:
+        abstract = True
+
+
+class CarModelPhoto(BasePhoto):
     '''Model of car model photo'''
     photo = models.ImageField(upload_to='car_models', verbose_name='Фото')
     car = models.ForeignKey(CarModel, on_delete=models.CASCADE,
@@ -100,7 +156,7 @@ class CarModelPhoto(models.Model):
         verbose_name_plural = 'Фотографии моделей машины'
 
 
-class BrandPhoto(models.Model):
+class BrandPhoto(BasePhoto):
     '''Model of brand photo'''
     photo = models.ImageField(upload_to='brands', verbose_name='Фото')
     brand = models.ForeignKey(
@@ -111,12 +167,14 @@ class BrandPhoto(models.Model):
         verbose_name_plural = 'Фотографии брендов'
 
 
-class CarPhoto(models.Model):
+class CarPhoto(BasePhoto):
     '''Model of User's car photo'''
     photo = models.FileField(upload_to='cars', verbose_name='Фото')
     car = models.ForeignKey(Car, on_delete=models.CASCADE,
                             verbose_name='Автомобиль', related_name='car_photo')
 
+    objects = CarRelatedQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Фотография автомобиля'
         verbose_name_plural = 'Фотографии автомобилей'
@@ -0,0 +1,12 @@
+from core.pagination import KeysetPagination
+
+
+class CarKeysetPagination(KeysetPagination):
+    '''Keyset pagination of cars by creation date or price'''
+    orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+    }
+    default_ordering = '-created_at'
@@ -0,0 +1,51 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+
+
+def variant_name(name, width):
+    '''Name of the variant stored next to the original, cars/a.jpg -> cars/a_320.webp'''
+    root, _ = os.path.splitext(name)
+    return f'{root}_{width}.{VARIANT_EXTENSION}'
+
+
+def render_variant(image, width, quality):
+    '''Resizes the image to the given width keeping aspect ratio and encodes it to WebP'''
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, VARIANT_FORMAT, quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def build_variants(field_file, widths=None, quality=None, on_progress=None):
+    '''
+    Builds variants of the photo and saves them to its storage.
+    Widths larger than the original are skipped, the image is never upscaled.
+    Returns a dict {width: storage name}, on_progress(done, total) is called
+    after every saved variant.
+    '''
+    widths = sorted(widths or settings.PHOTO_VARIANT_WIDTHS)
+    quality = quality or settings.PHOTO_VARIANT_QUALITY
+    storage = field_file.storage
+    with field_file.open('rb'):
+        with Image.open(field_file) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    widths = [width for width in widths if width <= image.width]
+    variants = {}
+    for done, width in enumerate(widths, start=1):
+        name = variant_name(field_file.name, width)
+        if storage.exists(name):
+            storage.delete(name)
+        variants[str(width)] = storage.save(
+            name, ContentFile(render_variant(image, width, quality)))
+        if on_progress is not None:
+            on_progress(done, len(widths))
+    return variants
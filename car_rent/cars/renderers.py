@@ -0,0 +1,75 @@
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def encode_columns(rows, precision):
+    '''
+    Columnar form of a list of flat dicts for the map.
+
+    Every key becomes an array. Float values are turned into integers
+    with the given number of decimal places, then every numeric column
+    is stored as the first value followed by differences to the previous
+    one, which keeps neighbouring points down to a few digits. Decoding
+    is a running sum, divided by 10 ** precision for keys in "scaled".
+    '''
+    keys = list(rows[0]) if rows else []
+    scale = 10 ** precision
+    columns = {}
+    scaled = []
+    delta = []
+    for key in keys:
+        values = [row[key] for row in rows]
+        if any(isinstance(value, float) for value in values):
+            values = [round(value * scale) for value in values]
+            scaled.append(key)
+        elif not all(isinstance(value, int) for value in values):
+            columns[key] = values
+            continue
+        columns[key] = [value - previous for previous, value in zip([0, *values], values)]
+        delta.append(key)
+    return {
+        'size': len(rows),
+        'precision': precision,
+        'scaled': scaled,
+        'delta': delta,
+        'columns': columns,
+    }
+
+
+def to_columns(data):
+    '''Lists of rows are encoded in columns, anything else (errors) is kept as is'''
+    if isinstance(data, list):
+        return encode_columns(data, settings.CAR_MAP_COORDINATE_PRECISION)
+    return data
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    '''JSON with rows in delta-encoded columns'''
+    media_type = 'application/vnd.carrentino.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columns(data), accepted_media_type, renderer_context)
+
+
+class ColumnarMessagePackRenderer(BaseRenderer):
+    '''MessagePack with rows in delta-encoded columns'''
+    media_type = 'application/x-msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(to_columns(data))
+
+
+COLUMNAR_RENDERERS = [ColumnarJSONRenderer]
+if msgpack is not None:
+    COLUMNAR_RENDERERS.append(ColumnarMessagePackRenderer)
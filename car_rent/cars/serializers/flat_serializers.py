@@ -0,0 +1,17 @@
+from core.serializers import FlatSerializer
+
+from .model_serializers import CarListSerializer, CarMapSerializer
+
+
+class CarListFlatSerializer(FlatSerializer):
+    '''Быстрый сериалайзер автомобилей в списке'''
+    class Meta:
+        serializer = CarListSerializer
+        # поля сортировок CarKeysetPagination для курсора
+        extra_fields = ('created_at',)
+
+
+class CarMapFlatSerializer(FlatSerializer):
+    '''Быстрый сериалайзер автомобилей на карте'''
+    class Meta:
+        serializer = CarMapSerializer
@@ -1,16 +1,27 @@
 from cars.models import (Brand, BrandPhoto, Car, CarModel, CarModelPhoto,
                          CarOption, CarPhoto)
+from core.serializers import (MediaFileField, MediaListSerializer,
+                              MediaURLsField, SparseFieldsMixin,
+                              get_sparse_fields, model_columns)
+from django.db.models import Prefetch
 from rest_framework import serializers
 from users.serializers.model_serializers import UserSerializer
 
 
 class BrandPhotoSerializer(serializers.ModelSerializer):
     '''Сериалайзер фото бренда'''
+    photo = MediaFileField(public=True)
+    variants = MediaURLsField(public=True)
+    variants_status = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = BrandPhoto
+        list_serializer_class = MediaListSerializer
         fields = [
             'id',
             'photo',
+            'variants',
+            'variants_status',
         ]
 
 
@@ -30,11 +41,18 @@ class BrandSerializer(serializers.ModelSerializer):
 
 class CarModelPhotoSerializer(serializers.ModelSerializer):
     '''Сериалайзер фото модели автомобиля'''
+    photo = MediaFileField(public=True)
+    variants = MediaURLsField(public=True)
+    variants_status = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = CarModelPhoto
+        list_serializer_class = MediaListSerializer
         fields = [
             'id',
             'photo',
+            'variants',
+            'variants_status',
         ]
 
 
@@ -58,12 +76,18 @@ class CarModelSerializer(serializers.ModelSerializer):
 
 class CarPhotoSerializer(serializers.ModelSerializer):
     '''Сериалайзер фотографии автомобиля'''
+    photo = MediaFileField()
+    variants = MediaURLsField()
+    variants_status = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = CarPhoto
+        list_serializer_class = MediaListSerializer
         fields = [
             'id',
             'photo',
+            'variants',
+            'variants_status',
         ]
 
 
@@ -77,7 +101,7 @@ class CarOptionSerializer(serializers.ModelSerializer):
         ]
 
 
-class CarSerializer(serializers.ModelSerializer):
+class CarSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     '''Сериалайзер автомобилей'''
     car_model = CarModelSerializer(read_only=True)
     car_model_id = serializers.CharField(write_only=True)
@@ -107,6 +131,37 @@ class CarSerializer(serializers.ModelSerializer):
             'photos',
             'options',
         ]
+        expandable_fields = ('car_model', 'owner', 'photos', 'options')
+
+    @classmethod
+    def setup_queryset(cls, queryset, request):
+        '''
+        Запрос только нужных для ?fields=/?expand= колонок, связи
+        присоединяются и подгружаются только если их раскрывают
+        '''
+        readable = [name for name, field in cls().fields.items() if not field.write_only]
+        fields, expand = get_sparse_fields(request, readable, cls.Meta.expandable_fields)
+        columns = {'id', *(fields & set(model_columns(cls)))}
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if 'car_model' in fields:
+            columns.add('car_model')
+        if 'car_model' in expand:
+            columns.update(model_columns(CarModelSerializer, 'car_model__'))
+            columns.update(model_columns(BrandSerializer, 'car_model__brand__'))
+            queryset = queryset.select_related('car_model__brand').prefetch_related(
+                'car_model__carmodel_photo', 'car_model__brand__brand_photo')
+        if 'owner' in fields:
+            columns.add('owner')
+        if 'owner' in expand:
+            columns.update(model_columns(UserSerializer, 'owner__'))
+            queryset = queryset.select_related('owner')
+        if 'photos' in fields:
+            photos = CarPhoto.objects.all() if 'photos' in expand else CarPhoto.objects.only('id', 'car')
+            queryset = queryset.prefetch_related(Prefetch('car_photo', queryset=photos))
+        if 'options' in fields:
+            options = CarOption.objects.all() if 'options' in expand else CarOption.objects.only('id', 'car')
+            queryset = queryset.prefetch_related(Prefetch('car_option', queryset=options))
+        return queryset.only(*columns)
 
 
 class CarListSerializer(serializers.ModelSerializer):
@@ -130,3 +185,18 @@ class CarMapSerializer(serializers.ModelSerializer):
             'latitude',
             'longitude',
         ]
+
+
+class CarNearestSerializer(serializers.ModelSerializer):
+    '''Сериалайзер ближайших автомобилей с расстоянием до них в км'''
+    distance = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Car
+        fields = [
+            'id',
+            'latitude',
+            'longitude',
+            'price',
+            'distance',
+        ]
@@ -0,0 +1,139 @@
+from cars.choices import FLEET_IMPORT_FORMAT_CHOICES
+from cars.uploads import PHOTO_UPLOAD_EXTENSIONS, load_photo_upload
+from django.conf import settings
+from django.core import signing
+from rest_framework import serializers
+
+from .model_serializers import CarPhotoSerializer
+
+
+class CarMapQuerySerializer(serializers.Serializer):
+    '''Serializer for map view query params'''
+    zoom = serializers.IntegerField(min_value=0, max_value=22, required=False)
+
+
+class CarClusterSerializer(serializers.Serializer):
+    '''Serializer for cluster of cars on the map'''
+    latitude = serializers.FloatField(source='lat')
+    longitude = serializers.FloatField(source='lon')
+    count = serializers.IntegerField()
+    min_price = serializers.IntegerField()
+
+
+class CarNearestQuerySerializer(serializers.Serializer):
+    '''Serializer for nearest cars query params'''
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(
+        min_value=1, max_value=settings.CAR_NEAREST_MAX_K, default=10)
+
+
+class CatalogAutocompleteQuerySerializer(serializers.Serializer):
+    '''Serializer for catalog autocomplete query params'''
+    q = serializers.CharField(min_length=1, max_length=100)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.CATALOG_AUTOCOMPLETE_MAX_LIMIT, default=10)
+
+
+class CatalogSuggestionSerializer(serializers.Serializer):
+    '''Serializer for brand or car model suggestion'''
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    type = serializers.CharField()
+    brand_id = serializers.IntegerField()
+    brand_title = serializers.CharField()
+    photo = serializers.CharField(allow_null=True)
+
+
+class CarPhotoUploadSerializer(serializers.Serializer):
+    '''Serializer for presigned car photo upload request'''
+    content_type = serializers.ChoiceField(choices=list(PHOTO_UPLOAD_EXTENSIONS))
+
+
+class CarPhotoUploadFormSerializer(serializers.Serializer):
+    '''Serializer for presigned POST form, fields are sent with the file'''
+    url = serializers.URLField()
+    fields = serializers.DictField(child=serializers.CharField())
+    token = serializers.CharField()
+    max_size = serializers.IntegerField()
+    expires_in = serializers.IntegerField()
+
+
+class CarPhotoConfirmSerializer(serializers.Serializer):
+    '''Serializer for confirmation of uploaded car photo'''
+    token = serializers.CharField()
+
+    def validate_token(self, value):
+        try:
+            return load_photo_upload(value)
+        except signing.BadSignature:
+            raise serializers.ValidationError('Недействительный или просроченный токен загрузки')
+
+
+class CarPhotoBatchSerializer(serializers.Serializer):
+    '''Serializer for batch car photo upload, files are validated one by one in the view'''
+    photos = serializers.ListField(
+        child=serializers.FileField(), allow_empty=False, max_length=settings.PHOTO_BATCH_MAX_FILES)
+
+
+class CarPhotoBatchErrorSerializer(serializers.Serializer):
+    '''Serializer for error of one file of the batch'''
+    file = serializers.CharField()
+    error = serializers.CharField()
+
+
+class CarPhotoBatchResultSerializer(serializers.Serializer):
+    '''Serializer for result of batch car photo upload'''
+    created = CarPhotoSerializer(many=True)
+    errors = CarPhotoBatchErrorSerializer(many=True)
+
+
+class FleetImportRowSerializer(serializers.Serializer):
+    '''Serializer for one car of fleet import, car model is given by id or by brand and model titles'''
+    car_model = serializers.IntegerField(required=False)
+    brand = serializers.CharField(required=False, max_length=200)
+    model = serializers.CharField(required=False, max_length=200)
+    color = serializers.CharField(max_length=25)
+    price = serializers.IntegerField(min_value=0, max_value=2147483647)
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    options = serializers.ListField(
+        child=serializers.CharField(max_length=200), required=False, default=list)
+
+    def validate(self, attrs):
+        if 'car_model' not in attrs and ('brand' not in attrs or 'model' not in attrs):
+            raise serializers.ValidationError('Укажите car_model или brand и model')
+        return attrs
+
+
+class FleetImportSerializer(serializers.Serializer):
+    '''Serializer for fleet import file, format is detected by extension when omitted'''
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=FLEET_IMPORT_FORMAT_CHOICES.CHOICES, required=False)
+
+
+class FleetImportErrorSerializer(serializers.Serializer):
+    '''Serializer for errors of one row of fleet import'''
+    row = serializers.IntegerField()
+    errors = serializers.DictField()
+
+
+class FleetImportReportSerializer(serializers.Serializer):
+    '''Serializer for fleet import report'''
+    total = serializers.IntegerField()
+    created = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    errors = FleetImportErrorSerializer(many=True)
+    error = serializers.CharField(allow_null=True)
+
+
+class FleetImportQueuedSerializer(serializers.Serializer):
+    '''Serializer for queued fleet import, id is passed to import_status_view'''
+    id = serializers.CharField()
+
+
+class FleetImportStatusSerializer(serializers.Serializer):
+    '''Serializer for state of queued fleet import'''
+    state = serializers.CharField()
+    processed = serializers.IntegerField(allow_null=True)
+    report = FleetImportReportSerializer(allow_null=True)
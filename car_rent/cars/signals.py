@@ -0,0 +1,29 @@
+from functools import partial
+
+from core.cache import bump_version
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Brand, BrandPhoto, CarModel, CarModelPhoto, CarPhoto
+from .tasks import build_photo_variants
+from .utils import CATALOG_CACHE_NAMESPACE
+
+
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=BrandPhoto)
+@receiver([post_save, post_delete], sender=CarModel)
+@receiver([post_save, post_delete], sender=CarModelPhoto)
+def invalidate_catalog(sender, **kwargs):
+    '''Drops cached brand and car model responses'''
+    bump_version(CATALOG_CACHE_NAMESPACE)
+
+
+@receiver(post_save, sender=BrandPhoto)
+@receiver(post_save, sender=CarModelPhoto)
+@receiver(post_save, sender=CarPhoto)
+def schedule_photo_variants(sender, instance, created, **kwargs):
+    '''Queues building of variants of a new photo once it is committed'''
+    if created:
+        transaction.on_commit(
+            partial(build_photo_variants.delay, sender._meta.label, instance.pk))
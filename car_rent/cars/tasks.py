@@ -0,0 +1,73 @@
+import logging
+
+from celery import shared_task
+from core.cache import bump_version
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .choices import PHOTO_VARIANTS_STATUS_CHOICES
+from .models import Car, CarPhoto
+from .photos import build_variants
+from .utils import CATALOG_CACHE_NAMESPACE
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True)
+def build_photo_variants(self, model_label, pk):
+    '''
+    Builds resized WebP variants of a photo, model_label is e.g. "cars.CarPhoto".
+    Progress is reported as the PROGRESS state with done/total variants,
+    the result is kept in the variants and variants_status of the photo.
+    '''
+    model = apps.get_model(model_label)
+    photos = model.objects.filter(pk=pk)
+    photo = photos.first()
+    if photo is None:
+        return None
+    photos.update(variants_status=PHOTO_VARIANTS_STATUS_CHOICES.PROCESSING)
+
+    def report_progress(done, total):
+        if self.request.id and not self.request.is_eager:
+            self.update_state(state='PROGRESS', meta={'done': done, 'total': total})
+
+    try:
+        variants = build_variants(photo.photo, on_progress=report_progress)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception('Failed to build variants of %s %s', model_label, pk)
+        photos.update(variants_status=PHOTO_VARIANTS_STATUS_CHOICES.FAILED)
+        return None
+    except Exception:
+        # the photo must not stay PROCESSING, backfill skips such rows
+        photos.update(variants_status=PHOTO_VARIANTS_STATUS_CHOICES.FAILED)
+        raise
+    photos.update(variants=variants, variants_status=PHOTO_VARIANTS_STATUS_CHOICES.READY)
+    # update() skips signals, the responses showing the photo are refreshed here
+    if isinstance(photo, CarPhoto):
+        Car.objects.filter(pk=photo.car_id).touch()
+    else:
+        bump_version(CATALOG_CACHE_NAMESPACE)
+    return variants
+
+
+@shared_task(bind=True)
+def import_fleet_file(self, owner_id, name, file_format):
+    '''
+    Imports cars from a file saved to the default storage and deletes it.
+    Progress is reported as the PROGRESS state with processed rows.
+    '''
+    # fleet_import depends on serializers that import this module
+    from .fleet_import import import_fleet, read_rows
+
+    def report_progress(processed):
+        if self.request.id and not self.request.is_eager:
+            self.update_state(state='PROGRESS', meta={'processed': processed})
+
+    owner = get_user_model().objects.get(pk=owner_id)
+    try:
+        with default_storage.open(name, 'rb') as file:
+            return import_fleet(owner, read_rows(file, file_format), on_progress=report_progress)
+    finally:
+        default_storage.delete(name)
@@ -0,0 +1,105 @@
+import posixpath
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from .models import Car, CarPhoto
+from .tasks import build_photo_variants
+
+PHOTO_UPLOAD_SALT = 'cars.photo_upload'
+PHOTO_UPLOAD_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+}
+
+
+def photo_storage():
+    return CarPhoto._meta.get_field('photo').storage
+
+
+def photo_upload_name(content_type):
+    '''New unique name of car photo in the upload_to directory of CarPhoto.photo'''
+    upload_to = CarPhoto._meta.get_field('photo').upload_to
+    return posixpath.join(upload_to, f'{uuid.uuid4().hex}.{PHOTO_UPLOAD_EXTENSIONS[content_type]}')
+
+
+def presigned_post(storage, name, content_type):
+    '''
+    Presigned POST form letting the client upload the file straight to the
+    S3 compatible storage (MinIO, S3). The storage rejects files of other
+    content type or larger than PHOTO_UPLOAD_MAX_SIZE.
+    '''
+    if not hasattr(storage, 'bucket_name'):
+        raise ImproperlyConfigured('Presigned uploads require S3 compatible default storage')
+    client = storage.connection.meta.client
+    return client.generate_presigned_post(
+        storage.bucket_name,
+        storage._normalize_name(name),
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, settings.PHOTO_UPLOAD_MAX_SIZE],
+        ],
+        ExpiresIn=settings.PHOTO_UPLOAD_EXPIRES,
+    )
+
+
+def sign_photo_upload(car_id, name):
+    return signing.dumps({'car': car_id, 'name': name}, salt=PHOTO_UPLOAD_SALT)
+
+
+def load_photo_upload(token):
+    '''Returns {"car": id, "name": name} of the upload, raises signing.BadSignature'''
+    return signing.loads(token, salt=PHOTO_UPLOAD_SALT, max_age=settings.PHOTO_UPLOAD_CONFIRM_MAX_AGE)
+
+
+def validate_photo_file(file):
+    '''Returns the error of uploaded photo or None'''
+    if file.content_type not in PHOTO_UPLOAD_EXTENSIONS:
+        return 'Недопустимый тип файла'
+    if not file.size:
+        return 'Пустой файл'
+    if file.size > settings.PHOTO_UPLOAD_MAX_SIZE:
+        return 'Файл слишком большой'
+    return None
+
+
+def save_photo_files(storage, files):
+    '''
+    Writes files to the storage in a bounded thread pool, S3 storage keeps a
+    connection per thread. Returns a list of (name, error) in order of files.
+    '''
+    field = CarPhoto._meta.get_field('photo')
+    workers = max(1, min(settings.PHOTO_UPLOAD_WORKERS, len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(storage.save, field.generate_filename(None, file.name), file)
+            for file in files
+        ]
+    results = []
+    for future in futures:
+        try:
+            results.append((future.result(), None))
+        except Exception:
+            results.append((None, 'Не удалось сохранить файл'))
+    return results
+
+
+def create_car_photos(car, names):
+    '''
+    Creates photos of stored files with one query. bulk_create skips
+    post_save, so variants are queued here like the signal does.
+    '''
+    with transaction.atomic():
+        photos = CarPhoto.objects.bulk_create([CarPhoto(car=car, photo=name) for name in names])
+        Car.objects.filter(pk=car.pk).touch()
+        for photo in photos:
+            transaction.on_commit(
+                partial(build_photo_variants.delay, CarPhoto._meta.label, photo.pk))
+    return photos
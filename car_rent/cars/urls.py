@@ -9,6 +9,7 @@ router_v1 = DefaultRouter()
 
 router_v1.register('brand', BrandView, basename='brand')
 router_v1.register('car-model', CarModelView, basename='car-model')
+router_v1.register('catalog', CatalogView, basename='catalog')
 router_v1.register('car', CarView, basename='car')
 router_v1.register('car-photo', CarPhotoView, basename='car-photo')
 router_v1.register('car-option', CarOptionView, basename='car-option')
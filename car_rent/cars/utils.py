@@ -0,0 +1,163 @@
+import heapq
+import math
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import (Avg, BooleanField, Count, F, Field, Func, Min, Q,
+                              Value)
+from django.db.models.functions import Floor
+
+TILE_SIZE_DEGREES = 360
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+NEAREST_START_PRECISION = 6
+CATALOG_CACHE_NAMESPACE = 'catalog'
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    '''Encodes coordinates to geohash of the given length'''
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(geohash)
+
+
+class GeoPoint(Func):
+    '''Postgres point, x is longitude and y is latitude'''
+    function = 'point'
+    output_field = Field()
+
+
+class GeoBox(Func):
+    '''Postgres box between two corner points'''
+    function = 'box'
+    output_field = Field()
+
+
+class ContainedIn(Func):
+    '''Postgres <@ operator, served by a GiST index on the left side'''
+    arg_joiner = ' <@ '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def car_location():
+    '''Expression of the car location, the same as in the GiST index'''
+    return GeoPoint(F('longitude'), F('latitude'))
+
+
+def in_viewport(min_lat: float, max_lat: float, min_lon: float, max_lon: float):
+    '''
+    Condition for cars inside the map viewport. A viewport crossing the
+    antimeridian has min_lon > max_lon and is split into two boxes.
+    '''
+    if min_lon <= max_lon:
+        lon_ranges = [(min_lon, max_lon)]
+    else:
+        lon_ranges = [(min_lon, 180.0), (-180.0, max_lon)]
+    return reduce(or_, (
+        Q(ContainedIn(car_location(), GeoBox(
+            GeoPoint(Value(west), Value(min_lat)), GeoPoint(Value(east), Value(max_lat)))))
+        for west, east in lon_ranges
+    ))
+
+
+def geohash_cell_size(precision: int) -> tuple[float, float]:
+    '''Height and width in degrees of a geohash cell of the given length'''
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+
+def geohash_block(latitude: float, longitude: float, precision: int) -> set[str]:
+    '''Geohash cell of the point together with its eight neighbours'''
+    height, width = geohash_cell_size(precision)
+    cells = set()
+    for d_lat in (-height, 0, height):
+        lat = latitude + d_lat
+        if not -90 <= lat <= 90:
+            continue
+        for d_lon in (-width, 0, width):
+            lon = (longitude + d_lon + 180) % 360 - 180
+            cells.add(encode_geohash(lat, lon, precision))
+    return cells
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    '''Great-circle distance between two points in kilometers'''
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def nearest_cars(queryset, latitude: float, longitude: float, k: int) -> list[tuple[float, int]]:
+    '''
+    Returns (distance, id) of k nearest cars, closest first.
+
+    Looks up the 3x3 block of geohash cells around the point, widening the
+    block one precision level at a time until k cars are found inside the
+    radius the block is guaranteed to cover. Every lookup is a prefix scan
+    of the (status, geohash) index, the whole queryset is read only when
+    even the widest block holds fewer than k cars.
+    '''
+    found = []
+    for precision in range(NEAREST_START_PRECISION, -1, -1):
+        candidates = queryset
+        covered_km = math.inf
+        if precision:
+            cells = geohash_block(latitude, longitude, precision)
+            candidates = queryset.filter(
+                reduce(or_, (Q(geohash__startswith=cell) for cell in cells)))
+            height, width = geohash_cell_size(precision)
+            widest_lat = min(abs(latitude) + height, 90)
+            covered_km = min(height, width * math.cos(math.radians(widest_lat))) * KM_PER_DEGREE
+        found = heapq.nsmallest(k, (
+            (haversine(latitude, longitude, lat, lon), pk)
+            for pk, lat, lon in candidates.values_list('id', 'latitude', 'longitude')
+        ))
+        if len(found) == k and found[-1][0] <= covered_km:
+            break
+    return found
+
+
+def cluster_cell_size(zoom: int) -> float:
+    '''Size of a cluster grid cell in degrees for the given map zoom'''
+    return TILE_SIZE_DEGREES / (2 ** zoom * settings.CAR_MAP_CLUSTER_CELLS_PER_TILE)
+
+
+def cluster_cars(queryset, zoom: int):
+    '''Aggregates cars into grid cells, one row per non-empty cell'''
+    size = cluster_cell_size(zoom)
+    return queryset.annotate(
+        cell_x=Floor(F('longitude') / size),
+        cell_y=Floor(F('latitude') / size),
+    ).values('cell_x', 'cell_y').annotate(
+        lat=Avg('latitude'),
+        lon=Avg('longitude'),
+        count=Count('id'),
+        min_price=Min('price'),
+    ).order_by()
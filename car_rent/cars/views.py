@@ -1,24 +1,73 @@
-from core.views import BaseGetView
+from celery.result import AsyncResult
+from core.cache import get_version
+from core.schema import SPARSE_FIELDS_PARAMETERS, STREAM_PARAMETER
+from core.serializers import model_columns
+from core.views import (BaseGetView, CachedResponseMixin, ConditionalGetMixin,
+                        StreamingListMixin)
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import Http404
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (OpenApiParameter, extend_schema,
                                    extend_schema_view)
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from users.permissions import IsCompany
+from users.serializers.model_serializers import UserSerializer
 
+from . import catalog
 from .choices import CAR_STATUS_CHOICES
-from .filtersets import BrandFilterset, CarModelFilterset
+from .filtersets import (BrandFilterset, CarFilterset, CarMapFilterset,
+                         CarModelFilterset)
+from .fleet_import import (detect_format, import_fleet, load_fleet_import,
+                           read_rows, sign_fleet_import)
+from .managers import CarQuerySet
 from .models import Brand, Car, CarModel, CarOption, CarPhoto
-from .permissions import (CarActionPermission, CarForeignPermission,
-                          CarPermission)
+from .pagination import CarKeysetPagination
+from .renderers import COLUMNAR_RENDERERS
 from .serializers.brief_serializers import (BrandBriefSerialzer,
                                             CarModelBriefSerializer)
+from .serializers.flat_serializers import (CarListFlatSerializer,
+                                           CarMapFlatSerializer)
 from .serializers.model_serializers import (BrandSerializer, CarListSerializer,
                                             CarMapSerializer,
                                             CarModelSerializer,
+                                            CarNearestSerializer,
                                             CarOptionSerializer,
                                             CarPhotoSerializer, CarSerializer)
+from .serializers.serializers import (CarClusterSerializer,
+                                      CarMapQuerySerializer,
+                                      CarNearestQuerySerializer,
+                                      CarPhotoBatchResultSerializer,
+                                      CarPhotoBatchSerializer,
+                                      CarPhotoConfirmSerializer,
+                                      CarPhotoUploadFormSerializer,
+                                      CarPhotoUploadSerializer,
+                                      CatalogAutocompleteQuerySerializer,
+                                      CatalogSuggestionSerializer,
+                                      FleetImportQueuedSerializer,
+                                      FleetImportReportSerializer,
+                                      FleetImportSerializer,
+                                      FleetImportStatusSerializer)
+from .tasks import import_fleet_file
+from .uploads import (create_car_photos, photo_storage, photo_upload_name,
+                      presigned_post, save_photo_files, sign_photo_upload,
+                      validate_photo_file)
+from .utils import CATALOG_CACHE_NAMESPACE, cluster_cars, nearest_cars
+
+PAGINATION_PARAMETERS = [
+    OpenApiParameter(name='cursor', type=OpenApiTypes.STR, required=False, location=OpenApiParameter.QUERY,
+                     description='Курсор страницы из ссылки next'),
+    OpenApiParameter(name='page_size', type=OpenApiTypes.INT, required=False, location=OpenApiParameter.QUERY,
+                     description='Количество автомобилей на странице'),
+    OpenApiParameter(name='ordering', type=OpenApiTypes.STR, required=False, location=OpenApiParameter.QUERY,
+                     description='Сортировка', enum=list(CarKeysetPagination.orderings)),
+    STREAM_PARAMETER,
+]
 
 
 @extend_schema_view(
@@ -33,8 +82,10 @@ from .serializers.model_serializers import (BrandSerializer, CarListSerializer,
         description="Retrieve a brands"
     )
 )
-class BrandView(BaseGetView):
+class BrandView(CachedResponseMixin, BaseGetView):
     '''View for brands, only list and retrieve'''
+    cache_namespace = CATALOG_CACHE_NAMESPACE
+    media_public = True
     queryset = Brand.objects.prefetch_related('brand_photo')
     queryset_brief = Brand.objects.only('id', 'title').all()
     serializer_class = BrandSerializer
@@ -54,8 +105,10 @@ class BrandView(BaseGetView):
         description="Retrieve a car model"
     )
 )
-class CarModelView(BaseGetView):
+class CarModelView(CachedResponseMixin, BaseGetView):
     '''View for car models, only list and retrieve'''
+    cache_namespace = CATALOG_CACHE_NAMESPACE
+    media_public = True
     queryset = CarModel.objects.select_related(
         'brand').prefetch_related('carmodel_photo', 'brand__brand_photo')
     queryset_brief = CarModel.objects.only('id', 'title').all()
@@ -65,6 +118,30 @@ class CarModelView(BaseGetView):
 
 
 @extend_schema_view(
+    autocomplete=extend_schema(
+        description="Brands and car models matching the typed text, typo tolerant",
+        parameters=[CatalogAutocompleteQuerySerializer],
+        responses=CatalogSuggestionSerializer(many=True),
+    )
+)
+class CatalogView(viewsets.GenericViewSet):
+    '''View for brand and car model autocomplete'''
+    serializer_class = CatalogSuggestionSerializer
+
+    @action(detail=False, methods=['get',])
+    def autocomplete(self, request):
+        params = CatalogAutocompleteQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        suggestions = catalog.autocomplete(params.validated_data['q'], params.validated_data['limit'])
+        serializer = self.get_serializer_class()(suggestions, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@extend_schema_view(
+    retrieve=extend_schema(
+        description="Автомобиль",
+        parameters=SPARSE_FIELDS_PARAMETERS,
+    ),
     list=extend_schema(
         description="Список автомобилей",
         parameters=[
@@ -73,19 +150,54 @@ class CarModelView(BaseGetView):
         ]
     ),
     map_view=extend_schema(
+        filters=True,
+        description='Автомобили на карте. При zoom не больше CAR_MAP_CLUSTER_MAX_ZOOM '
+                    'возвращаются кластеры автомобилей вместо отдельных точек',
         request=CarMapSerializer,
+        parameters=[
+            OpenApiParameter(name='zoom', type=OpenApiTypes.INT, required=False, location=OpenApiParameter.QUERY,
+                             description='Масштаб карты (0-22)'),
+            OpenApiParameter(name='min_lat', type=OpenApiTypes.FLOAT, required=False, location=OpenApiParameter.QUERY,
+                             description='Минимальная широта видимой области карты'),
+            OpenApiParameter(name='max_lat', type=OpenApiTypes.FLOAT, required=False, location=OpenApiParameter.QUERY,
+                             description='Максимальная широта видимой области карты'),
+            OpenApiParameter(name='min_lon', type=OpenApiTypes.FLOAT, required=False, location=OpenApiParameter.QUERY,
+                             description='Минимальная долгота видимой области карты, '
+                                         'больше max_lon если область пересекает 180-й меридиан'),
+            OpenApiParameter(name='max_lon', type=OpenApiTypes.FLOAT, required=False, location=OpenApiParameter.QUERY,
+                             description='Максимальная долгота видимой области карты'),
+        ],
         responses={
             status.HTTP_201_CREATED: CarMapSerializer,
+            status.HTTP_200_OK: CarClusterSerializer,
+        }
+    ),
+    nearest_view=extend_schema(
+        filters=True,
+        description='Ближайшие к точке проверенные автомобили, отсортированные по расстоянию',
+        parameters=[
+            OpenApiParameter(name='latitude', type=OpenApiTypes.FLOAT, required=True, location=OpenApiParameter.QUERY,
+                             description='Широта точки'),
+            OpenApiParameter(name='longitude', type=OpenApiTypes.FLOAT, required=True, location=OpenApiParameter.QUERY,
+                             description='Долгота точки'),
+            OpenApiParameter(name='k', type=OpenApiTypes.INT, required=False, location=OpenApiParameter.QUERY,
+                             description='Количество автомобилей'),
+        ],
+        responses={
+            status.HTTP_200_OK: CarNearestSerializer(many=True),
         }
     ),
     list_view=extend_schema(
+        filters=True,
         request=CarListSerializer,
+        parameters=PAGINATION_PARAMETERS,
         responses={
             status.HTTP_201_CREATED: CarListSerializer,
         }
     ),
     user_cars_view=extend_schema(
         request=CarListSerializer,
+        parameters=PAGINATION_PARAMETERS,
         responses={
             status.HTTP_201_CREATED: CarListSerializer,
             status.HTTP_401_UNAUTHORIZED: {
@@ -122,6 +234,57 @@ class CarModelView(BaseGetView):
             }
         }
     ),
+    import_view=extend_schema(
+        description='Импорт автопарка компании из CSV или JSON Lines, '
+                    'большие файлы импортируются в фоне, статус в import_status_view',
+        request={'multipart/form-data': FleetImportSerializer},
+        responses={
+            status.HTTP_201_CREATED: FleetImportReportSerializer,
+            status.HTTP_202_ACCEPTED: FleetImportQueuedSerializer,
+            status.HTTP_400_BAD_REQUEST: FleetImportReportSerializer,
+        }
+    ),
+    import_status_view=extend_schema(
+        description='Статус фонового импорта автопарка',
+        parameters=[
+            OpenApiParameter(name='id', type=OpenApiTypes.STR, required=True, location=OpenApiParameter.QUERY,
+                             description='id из ответа import_view'),
+        ],
+        responses={
+            status.HTTP_200_OK: FleetImportStatusSerializer,
+        }
+    ),
+    add_photos=extend_schema(
+        description='Добавление нескольких фото, ошибки возвращаются по каждому файлу',
+        request={'multipart/form-data': CarPhotoBatchSerializer},
+        responses={
+            status.HTTP_201_CREATED: CarPhotoBatchResultSerializer,
+            status.HTTP_400_BAD_REQUEST: CarPhotoBatchResultSerializer,
+        }
+    ),
+    upload_photo=extend_schema(
+        description='Форма для загрузки фото напрямую в хранилище, после загрузки вызывается confirm_photo',
+        request=CarPhotoUploadSerializer,
+        responses={
+            status.HTTP_200_OK: CarPhotoUploadFormSerializer,
+        }
+    ),
+    confirm_photo=extend_schema(
+        description='Добавление фото, загруженного по форме upload_photo',
+        request=CarPhotoConfirmSerializer,
+        responses={
+            status.HTTP_201_CREATED: CarPhotoSerializer,
+            status.HTTP_400_BAD_REQUEST: {
+                "type": "object",
+                "properties": {
+                    "error": {"type": "string"}
+                },
+                "example": {
+                    "error": 'Файл не загружен',
+                }
+            },
+        }
+    ),
     add_option=extend_schema(
         request=CarOptionSerializer,
         responses={
@@ -146,16 +309,37 @@ class CarModelView(BaseGetView):
         }
     )
 )
-class CarView(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+class CarView(ConditionalGetMixin, StreamingListMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin,
               mixins.UpdateModelMixin, mixins.DestroyModelMixin,
               viewsets.GenericViewSet):
     '''Вьюсет для автомобилей'''
     queryset = Car.objects.all()
+    # доступность зависит от заказов, которых нет в ETag
+    volatile_query_params = ('available_after', 'available_before')
 
     action_querysets = {
         'map_view': queryset.filter(status=CAR_STATUS_CHOICES.VERIFIED),
-        'list_view': queryset.filter(status=CAR_STATUS_CHOICES.VERIFIED).select_related('car_model', 'car_model__brand'),
-        'user_cars_view': queryset.select_related('car_model', 'car_model__brand'),
+        'nearest_view': queryset.filter(status=CAR_STATUS_CHOICES.VERIFIED),
+        'list_view': queryset.filter(status=CAR_STATUS_CHOICES.VERIFIED),
+        'user_cars_view': queryset,
+        'destroy': queryset,
+        'add_photo': queryset,
+        'add_photos': queryset,
+        'upload_photo': queryset,
+        'confirm_photo': queryset,
+        'add_option': queryset,
+    }
+
+    action_scopes = {
+        'retrieve': CarQuerySet.visible_to,
+        'update': CarQuerySet.owned_by,
+        'partial_update': CarQuerySet.owned_by,
+        'destroy': CarQuerySet.owned_by,
+        'add_photo': CarQuerySet.owned_by,
+        'add_photos': CarQuerySet.owned_by,
+        'upload_photo': CarQuerySet.owned_by,
+        'confirm_photo': CarQuerySet.owned_by,
+        'add_option': CarQuerySet.owned_by,
     }
 
     default_queryset = queryset.select_related(
@@ -172,24 +356,57 @@ class CarView(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
     serializer_class = CarSerializer
     serializer_classes = {
         'map_view': CarMapSerializer,
+        'nearest_view': CarNearestSerializer,
         'list_view': CarListSerializer,
         'user_cars_view': CarListSerializer,
+        'import_view': FleetImportSerializer,
+        'import_status_view': FleetImportStatusSerializer,
         'add_photo': CarPhotoSerializer,
+        'add_photos': CarPhotoBatchSerializer,
+        'upload_photo': CarPhotoUploadSerializer,
+        'confirm_photo': CarPhotoConfirmSerializer,
         'add_option': CarOptionSerializer,
     }
 
+    flat_serializer_classes = {
+        'map_view': CarMapFlatSerializer,
+        'list_view': CarListFlatSerializer,
+        'user_cars_view': CarListFlatSerializer,
+    }
+
+    filterset_classes = {
+        'map_view': CarMapFilterset,
+        'nearest_view': CarFilterset,
+        'list_view': CarFilterset,
+    }
+
+    pagination_classes = {
+        'list_view': CarKeysetPagination,
+        'user_cars_view': CarKeysetPagination,
+    }
+
     permission_classes = {
-        'create': [IsAuthenticated | IsAdminUser],
-        'partial_update': [CarPermission | IsAdminUser],
-        'destroy': [CarPermission | IsAdminUser],
+        'create': [IsAuthenticated],
+        'update': [IsAuthenticated],
+        'partial_update': [IsAuthenticated],
+        'destroy': [IsAuthenticated],
         'user_cars_view': [IsAuthenticated],
-        'add_photo': [CarActionPermission | IsAdminUser],
-        'add_option': [CarActionPermission | IsAdminUser],
+        'import_view': [IsCompany],
+        'import_status_view': [IsCompany],
+        'add_photo': [IsAuthenticated],
+        'add_photos': [IsAuthenticated],
+        'upload_photo': [IsAuthenticated],
+        'confirm_photo': [IsAuthenticated],
+        'add_option': [IsAuthenticated],
     }
 
     def get_queryset(self):
         queryset = self.action_querysets.get(self.action, None)
-        return queryset if queryset is not None else self.default_queryset
+        queryset = queryset if queryset is not None else self.default_queryset
+        if self.request.method == 'GET' and hasattr(self.get_serializer_class(), 'setup_queryset'):
+            queryset = self.get_serializer_class().setup_queryset(queryset, self.request)
+        scope = self.action_scopes.get(self.action, None)
+        return scope(queryset, self.request.user) if scope is not None else queryset
 
     def get_serializer_class(self):
         serializer = self.serializer_classes.get(self.action, None)
@@ -199,6 +416,14 @@ class CarView(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
         permissions = self.permission_classes.get(self.action, [AllowAny,])
         return [permission() for permission in permissions]
 
+    @property
+    def filterset_class(self):
+        return self.filterset_classes.get(self.action, None)
+
+    @property
+    def pagination_class(self):
+        return self.pagination_classes.get(self.action, None)
+
     def create(self, request, *args, **kwargs):
         """Создание заказа"""
         serializer = self.get_serializer_class()
@@ -207,26 +432,112 @@ class CarView(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
         serializer.save(owner=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    @action(detail=False, methods=['get',])
+    def retrieve(self, request, *args, **kwargs):
+        '''Автомобиль, 304 если не изменился с прошлого запроса'''
+        try:
+            queryset = self.get_queryset().filter(pk=kwargs['pk'])
+        except (TypeError, ValueError):
+            raise Http404
+        not_modified = self.check_not_modified(request, queryset, get_version(CATALOG_CACHE_NAMESPACE),
+                                               fields=model_columns(UserSerializer, 'owner__'))
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get',],
+            renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, *COLUMNAR_RENDERERS])
     def map_view(self, request):
         '''Автомобили на карте'''
-        queryset = self.get_queryset()
-        serializer = self.get_serializer_class()(queryset, many=True)
+        params = CarMapQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        not_modified = self.check_not_modified(request, queryset)
+        if not_modified is not None:
+            return not_modified
+        zoom = params.validated_data.get('zoom')
+        if zoom is not None and zoom <= settings.CAR_MAP_CLUSTER_MAX_ZOOM:
+            serializer = CarClusterSerializer(
+                cluster_cars(queryset, zoom), many=True)
+        else:
+            serializer_class = self.flat_serializer_classes[self.action]
+            serializer = serializer_class(serializer_class.values(queryset))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get',])
+    def nearest_view(self, request):
+        '''Ближайшие автомобили'''
+        params = CarNearestQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        nearest = nearest_cars(queryset, **params.validated_data)
+        cars = queryset.in_bulk([pk for _, pk in nearest])
+        for distance, pk in nearest:
+            if pk in cars:
+                cars[pk].distance = distance
+        serializer = self.get_serializer_class()(
+            [cars[pk] for _, pk in nearest if pk in cars], many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get',])
     def list_view(self, request):
         '''Автомобили списком'''
-        queryset = self.get_queryset()
-        serializer = self.get_serializer_class()(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        queryset = self.filter_queryset(self.get_queryset())
+        not_modified = self.check_not_modified(request, queryset)
+        if not_modified is not None:
+            return not_modified
+        serializer_class = self.flat_serializer_classes[self.action]
+        if self.is_streaming(request):
+            return self.streaming_response(request, serializer_class, queryset)
+        page = self.paginate_queryset(serializer_class.values(queryset))
+        serializer = serializer_class(page)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get',])
     def user_cars_view(self, request):
         '''Автомобили пользователя'''
+        serializer_class = self.flat_serializer_classes[self.action]
         queryset = self.get_queryset().filter(owner=request.user)
-        serializer = self.get_serializer_class()(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if self.is_streaming(request):
+            return self.streaming_response(request, serializer_class, queryset)
+        page = self.paginate_queryset(serializer_class.values(queryset))
+        serializer = serializer_class(page)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def import_view(self, request):
+        '''Импорт автопарка компании'''
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file = serializer.validated_data['file']
+        file_format = serializer.validated_data.get('file_format') or detect_format(file.name)
+        if file_format is None:
+            return Response({'error': 'Неизвестный формат файла'}, status=status.HTTP_400_BAD_REQUEST)
+        if file.size > settings.FLEET_IMPORT_SYNC_MAX_SIZE:
+            name = default_storage.save(f'fleet_imports/{file.name}', file)
+            task = import_fleet_file.delay(request.user.pk, name, file_format)
+            data = FleetImportQueuedSerializer({'id': sign_fleet_import(task.id, request.user.pk)}).data
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+        report = import_fleet(request.user, read_rows(file, file_format))
+        data = FleetImportReportSerializer(report).data
+        return Response(data, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def import_status_view(self, request):
+        '''Статус фонового импорта автопарка'''
+        try:
+            job = load_fleet_import(request.query_params.get('id', ''))
+        except signing.BadSignature:
+            raise Http404
+        if job['owner'] != request.user.pk:
+            raise Http404
+        result = AsyncResult(job['task'])
+        info = result.info if isinstance(result.info, dict) else {}
+        data = FleetImportStatusSerializer({
+            'state': result.state,
+            'processed': info.get('processed', None),
+            'report': result.result if result.successful() else None,
+        }).data
+        return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def add_photo(self, request, pk=None):
@@ -235,8 +546,68 @@ class CarView(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
         serializer = self.get_serializer_class()(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(car=car)
+        Car.objects.filter(pk=car.pk).touch()
         return Response({'ok': 'Фото добавлено'}, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['post'])
+    def add_photos(self, request, pk=None):
+        '''Добавление нескольких фото, файлы пишутся в хранилище параллельно'''
+        car = self.get_object()
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        files, errors = [], []
+        for file in serializer.validated_data['photos']:
+            error = validate_photo_file(file)
+            if error is None:
+                files.append(file)
+            else:
+                errors.append({'file': file.name, 'error': error})
+        names = []
+        for file, (name, error) in zip(files, save_photo_files(photo_storage(), files)):
+            if error is None:
+                names.append(name)
+            else:
+                errors.append({'file': file.name, 'error': error})
+        photos = create_car_photos(car, names) if names else []
+        data = CarPhotoBatchResultSerializer({'created': photos, 'errors': errors}).data
+        return Response(data, status=status.HTTP_201_CREATED if photos else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['post'])
+    def upload_photo(self, request, pk=None):
+        '''Форма для загрузки фото напрямую в хранилище'''
+        car = self.get_object()
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = photo_upload_name(serializer.validated_data['content_type'])
+        form = presigned_post(photo_storage(), name, serializer.validated_data['content_type'])
+        data = CarPhotoUploadFormSerializer({
+            **form,
+            'token': sign_photo_upload(car.pk, name),
+            'max_size': settings.PHOTO_UPLOAD_MAX_SIZE,
+            'expires_in': settings.PHOTO_UPLOAD_EXPIRES,
+        }).data
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def confirm_photo(self, request, pk=None):
+        '''Добавление загруженного в хранилище фото, сами файлы через сервер не проходят'''
+        car = self.get_object()
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['token']
+        if upload['car'] != car.pk:
+            return Response({'error': 'Токен выдан для другого автомобиля'}, status=status.HTTP_400_BAD_REQUEST)
+        storage = photo_storage()
+        if not storage.exists(upload['name']):
+            return Response({'error': 'Файл не загружен'}, status=status.HTTP_400_BAD_REQUEST)
+        if storage.size(upload['name']) > settings.PHOTO_UPLOAD_MAX_SIZE:
+            storage.delete(upload['name'])
+            return Response({'error': 'Файл слишком большой'}, status=status.HTTP_400_BAD_REQUEST)
+        photo, created = CarPhoto.objects.get_or_create(car=car, photo=upload['name'])
+        if created:
+            Car.objects.filter(pk=car.pk).touch()
+        return Response(CarPhotoSerializer(photo).data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def add_option(self, request, pk=None):
         '''Добавление опции'''
@@ -244,22 +615,31 @@ class CarView(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
         serializer = self.get_serializer_class()(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(car=car)
+        Car.objects.filter(pk=car.pk).touch()
         return Response({'ok': 'Опция добавлена'}, status=status.HTTP_201_CREATED)
 
 
 class CarPhotoView(mixins.DestroyModelMixin, viewsets.GenericViewSet):
     '''Удаление фото автомобиля'''
     serializer_class = CarPhotoSerializer
-    permission_classes = [CarForeignPermission | IsAdminUser]
+    permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return CarPhoto.objects.filter(car__owner=self.request.user)
+        return CarPhoto.objects.owned_by(self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        Car.objects.filter(pk=instance.car_id).touch()
 
 
 class CarOptionView(mixins.DestroyModelMixin, viewsets.GenericViewSet):
     '''Удаление опции автомобиля'''
     serializer_class = CarOptionSerializer
-    permission_classes = [CarForeignPermission | IsAdminUser]
+    permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return CarOption.objects.filter(car__owner=self.request.user)
+        return CarOption.objects.owned_by(self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        Car.objects.filter(pk=instance.car_id).touch()
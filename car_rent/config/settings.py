@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'channels',
@@ -152,6 +153,9 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Size of chunks read from the database and written by streamed lists
+STREAMING_CHUNK_SIZE = int(os.getenv('STREAMING_CHUNK_SIZE', '500'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7)
@@ -191,6 +195,10 @@ STORAGES = {
         "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
     },
 }
+# Unsigned base URL (CDN) of public catalog photos, storage URLs are used when empty
+MEDIA_PUBLIC_BASE_URL = os.getenv('MEDIA_PUBLIC_BASE_URL', '')
+# Signed media URLs are cached until this many seconds before they expire
+MEDIA_URL_CACHE_MARGIN = int(os.getenv('MEDIA_URL_CACHE_MARGIN', '300'))
 #
 # Sentry
 #
@@ -225,6 +233,70 @@ CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
 
+#
+# Cache
+#
+CACHE_URL = os.getenv('CACHE_URL', os.getenv('REDIS_URL'))
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '86400'))
+
+
+#
+# Cars map
+#
+CAR_MAP_CLUSTER_MAX_ZOOM = int(os.getenv('CAR_MAP_CLUSTER_MAX_ZOOM', '13'))
+CAR_MAP_CLUSTER_CELLS_PER_TILE = int(os.getenv('CAR_MAP_CLUSTER_CELLS_PER_TILE', '4'))
+CAR_NEAREST_MAX_K = int(os.getenv('CAR_NEAREST_MAX_K', '50'))
+CAR_MAP_COORDINATE_PRECISION = int(os.getenv('CAR_MAP_COORDINATE_PRECISION', '5'))
+
+
+#
+# Catalog
+#
+CATALOG_AUTOCOMPLETE_MAX_LIMIT = int(os.getenv('CATALOG_AUTOCOMPLETE_MAX_LIMIT', '20'))
+CATALOG_INDEX_CHECK_INTERVAL = float(os.getenv('CATALOG_INDEX_CHECK_INTERVAL', '1'))
+CATALOG_INDEX_MAX_AGE = int(os.getenv('CATALOG_INDEX_MAX_AGE', '1800'))
+
+
+#
+# Photo variants
+#
+PHOTO_VARIANT_WIDTHS = [
+    int(width) for width in os.getenv('PHOTO_VARIANT_WIDTHS', '320,640,1280').split(',')]
+PHOTO_VARIANT_QUALITY = int(os.getenv('PHOTO_VARIANT_QUALITY', '80'))
+
+
+#
+# Photo uploads
+#
+PHOTO_UPLOAD_MAX_SIZE = int(os.getenv('PHOTO_UPLOAD_MAX_SIZE', str(10 * 1024 * 1024)))
+PHOTO_UPLOAD_EXPIRES = int(os.getenv('PHOTO_UPLOAD_EXPIRES', '600'))
+PHOTO_UPLOAD_CONFIRM_MAX_AGE = int(os.getenv('PHOTO_UPLOAD_CONFIRM_MAX_AGE', '3600'))
+PHOTO_BATCH_MAX_FILES = int(os.getenv('PHOTO_BATCH_MAX_FILES', '20'))
+PHOTO_UPLOAD_WORKERS = int(os.getenv('PHOTO_UPLOAD_WORKERS', '4'))
+
+
+#
+# Fleet import
+#
+FLEET_IMPORT_BATCH_SIZE = int(os.getenv('FLEET_IMPORT_BATCH_SIZE', '500'))
+FLEET_IMPORT_MAX_ERRORS = int(os.getenv('FLEET_IMPORT_MAX_ERRORS', '1000'))
+# larger files are imported by a celery task
+FLEET_IMPORT_SYNC_MAX_SIZE = int(os.getenv('FLEET_IMPORT_SYNC_MAX_SIZE', str(512 * 1024)))
+
+
 #
 # CSRF
 #
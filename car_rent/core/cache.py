@@ -0,0 +1,54 @@
+import hashlib
+
+from django.core.cache import cache
+
+HITS = 'hits'
+MISSES = 'misses'
+
+
+def _key(namespace, name):
+    return f'{namespace}:{name}'
+
+
+def _incr(key):
+    cache.add(key, 0, None)
+    return cache.incr(key)
+
+
+def get_version(namespace):
+    '''Current version of the namespace, part of every response key'''
+    return cache.get_or_set(_key(namespace, 'version'), 1, None)
+
+
+def bump_version(namespace):
+    '''Invalidates every cached response of the namespace'''
+    return _incr(_key(namespace, 'version'))
+
+
+def record(namespace, hit):
+    _incr(_key(namespace, HITS if hit else MISSES))
+
+
+def get_stats(namespace):
+    '''Hit/miss counters of the namespace'''
+    stats = cache.get_many([_key(namespace, HITS), _key(namespace, MISSES)])
+    hits = stats.get(_key(namespace, HITS), 0)
+    misses = stats.get(_key(namespace, MISSES), 0)
+    total = hits + misses
+    return {
+        'version': get_version(namespace),
+        HITS: hits,
+        MISSES: misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats(namespace):
+    cache.delete_many([_key(namespace, HITS), _key(namespace, MISSES)])
+
+
+def response_key(namespace, request, *parts):
+    '''Key of a cached response: namespace version, view parts and sorted query params'''
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    digest = hashlib.md5(repr(params).encode(), usedforsecurity=False).hexdigest()
+    return _key(namespace, ':'.join(map(str, (get_version(namespace), *parts, digest))))
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+MEDIA_URL_CACHE_PREFIX = 'media-url'
+
+
+def _key(name):
+    return f'{MEDIA_URL_CACHE_PREFIX}:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def url_lifetime(storage):
+    '''Seconds a URL of the storage stays valid, None for URLs without signature'''
+    if getattr(storage, 'querystring_auth', False):
+        return storage.querystring_expire
+    return None
+
+
+def signed_url_window(storage=None):
+    '''
+    Seconds a response with signed URLs of the storage may be reused,
+    None when the storage does not sign URLs
+    '''
+    lifetime = url_lifetime(storage or default_storage)
+    if lifetime is None:
+        return None
+    return max(1, (lifetime - settings.MEDIA_URL_CACHE_MARGIN) // 2)
+
+
+class MediaURLResolver:
+    '''
+    Builds URLs of stored files in batches and remembers them for its
+    lifetime, e.g. one response. Signed URLs are shared through the cache
+    together with their expiry time and reused while at least
+    min_lifetime seconds (and MEDIA_URL_CACHE_MARGIN) of it are left,
+    so whoever keeps the URLs for min_lifetime never holds expired ones.
+    Public URLs are built from MEDIA_PUBLIC_BASE_URL (CDN) without the
+    storage, when it is not set they are the usual storage URLs.
+    '''
+
+    def __init__(self, storage=None, min_lifetime=0):
+        self.storage = storage or default_storage
+        self.min_lifetime = min_lifetime
+        self.resolved = {}
+
+    @staticmethod
+    def is_public(public):
+        return public and bool(settings.MEDIA_PUBLIC_BASE_URL)
+
+    def resolve(self, names, public=False):
+        public = self.is_public(public)
+        names = {name for name in names if name and (public, name) not in self.resolved}
+        if not names:
+            return
+        if public:
+            base_url = settings.MEDIA_PUBLIC_BASE_URL.rstrip('/')
+            self.resolved.update({(True, name): f'{base_url}/{quote(name)}' for name in names})
+            return
+        lifetime = url_lifetime(self.storage)
+        if lifetime is None:
+            self.resolved.update({(False, name): self.storage.url(name) for name in names})
+            return
+        now = time.time()
+        keys = {_key(name): name for name in names}
+        fresh_until = now + max(self.min_lifetime, settings.MEDIA_URL_CACHE_MARGIN)
+        urls = {key: url for key, (url, expires_at) in cache.get_many(keys).items() if expires_at >= fresh_until}
+        signed = {key: (self.storage.url(keys[key]), now + lifetime) for key in keys if key not in urls}
+        if signed:
+            cache.set_many(signed, max(1, lifetime - settings.MEDIA_URL_CACHE_MARGIN))
+            urls.update({key: url for key, (url, _) in signed.items()})
+        self.resolved.update({(False, keys[key]): url for key, url in urls.items()})
+
+    def url(self, name, public=False):
+        key = (self.is_public(public), name)
+        if key not in self.resolved:
+            self.resolve([name], public)
+        return self.resolved[key]
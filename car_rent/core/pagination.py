@@ -0,0 +1,166 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    '''Keeps microseconds of datetimes, DjangoJSONEncoder cuts them to milliseconds'''
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    '''
+    Keyset (cursor) pagination.
+
+    Pages are selected with a WHERE condition on the values of the last row
+    of the previous page instead of OFFSET, so every page costs one index
+    range scan. Every ordering must end with a unique field.
+    '''
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    invalid_cursor_message = 'Invalid cursor'
+    orderings = {}
+    default_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        fields = [queryset.model._meta.get_field(field.lstrip('-')) for field in self.ordering]
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            values = self.get_cursor_values(fields, cursor)
+            queryset = queryset.filter(self.get_keyset_filter(values))
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param)
+        return self.orderings.get(ordering, self.orderings[self.default_ordering])
+
+    def get_keyset_filter(self, values):
+        '''
+        Condition for rows that go after the row with given values.
+
+        The non-strict bound on the first field is redundant but lets
+        Postgres turn the condition into an index range scan.
+        '''
+        names = [field.lstrip('-') for field in self.ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in self.ordering]
+        after = Q()
+        for i, (name, lookup) in enumerate(zip(names, lookups)):
+            condition = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_name, prev_value in zip(names[:i], values[:i]):
+                condition &= Q(**{prev_name: prev_value})
+            after |= condition
+        leading_lookup = 'lte' if lookups[0] == 'lt' else 'gte'
+        return Q(**{f'{names[0]}__{leading_lookup}': values[0]}) & after
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, list):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_cursor_values(self, fields, cursor):
+        '''Values of the ordering fields from a decoded cursor'''
+        if len(cursor) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for field, value in zip(fields, cursor):
+            try:
+                value = field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None and not field.null:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def encode_cursor(self, instance):
+        values = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        data = json.dumps(values, cls=CursorJSONEncoder).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.ordering_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Ordering of results.',
+                'schema': {'type': 'string', 'enum': list(self.orderings)},
+            },
+        ]
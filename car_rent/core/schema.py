@@ -0,0 +1,14 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+
+STREAM_PARAMETER = OpenApiParameter(
+    name='stream', type=OpenApiTypes.BOOL, required=False, location=OpenApiParameter.QUERY,
+    description='Отдать весь список потоковым JSON-массивом, без пагинации')
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(name='fields', type=OpenApiTypes.STR, required=False, location=OpenApiParameter.QUERY,
+                     description='Поля ответа через запятую, по умолчанию все'),
+    OpenApiParameter(name='expand', type=OpenApiTypes.STR, required=False, location=OpenApiParameter.QUERY,
+                     description='Связи, которые раскрываются объектами, остальные отдаются id. '
+                                 'Без fields и expand раскрываются все'),
+]
@@ -0,0 +1,241 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import fields, relations, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .media import MediaURLResolver
+
+# Fields whose to_representation does not change values read from the database
+PLAIN_FIELDS = (
+    fields.IntegerField,
+    fields.FloatField,
+    fields.CharField,
+    fields.BooleanField,
+    relations.PrimaryKeyRelatedField,
+)
+
+MEDIA_RESOLVER_CONTEXT_KEY = 'media_urls'
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def get_media_resolver(context):
+    '''MediaURLResolver shared by all serializers of one response'''
+    if MEDIA_RESOLVER_CONTEXT_KEY not in context:
+        context[MEDIA_RESOLVER_CONTEXT_KEY] = MediaURLResolver()
+    return context[MEDIA_RESOLVER_CONTEXT_KEY]
+
+
+class MediaFileField(serializers.FileField):
+    '''
+    FileField whose URL comes from the MediaURLResolver of the response.
+    public=True marks files that may be served by MEDIA_PUBLIC_BASE_URL.
+    '''
+
+    def __init__(self, public=False, **kwargs):
+        self.public = public
+        super().__init__(**kwargs)
+
+    def get_media_names(self, value):
+        return [value.name] if value else []
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = get_media_resolver(self.context).url(value.name, self.public)
+        request = self.context.get('request', None)
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+@extend_schema_field({'type': 'object', 'additionalProperties': {'type': 'string'}})
+class MediaURLsField(serializers.ReadOnlyField):
+    '''Dict of stored file names rendered as dict of their URLs'''
+
+    def __init__(self, public=False, **kwargs):
+        self.public = public
+        super().__init__(**kwargs)
+
+    def get_media_names(self, value):
+        return list(value.values()) if value else []
+
+    def to_representation(self, value):
+        resolver = get_media_resolver(self.context)
+        return {key: resolver.url(name, self.public) for key, name in value.items()}
+
+
+class MediaListSerializer(serializers.ListSerializer):
+    '''
+    List serializer resolving URLs of all media fields of its items in
+    one batch before rendering them, so signed URLs cost one cache round
+    trip per list instead of signing every file separately.
+    '''
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        batches = defaultdict(list)
+        for field in self.child.fields.values():
+            if isinstance(field, (MediaFileField, MediaURLsField)) and not field.write_only:
+                for item in items:
+                    batches[field.public].extend(field.get_media_names(field.get_attribute(item)))
+        resolver = get_media_resolver(self.context)
+        for public, names in batches.items():
+            resolver.resolve(names, public)
+        return super().to_representation(items)
+
+
+def _parse_names(request, param, available):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        raise ValidationError({param: f'Unknown fields: {", ".join(sorted(unknown))}'})
+    return names
+
+
+def get_sparse_fields(request, available, expandable):
+    '''
+    Requested fields and expanded relations from ?fields= and ?expand=.
+    Without both params everything is returned and expanded, with
+    ?fields= only relations listed in ?expand= are expanded.
+    '''
+    fields = _parse_names(request, FIELDS_QUERY_PARAM, available)
+    expand = _parse_names(request, EXPAND_QUERY_PARAM, expandable)
+    if expand is None:
+        expand = set(expandable) if fields is None else set()
+    if fields is None:
+        fields = set(available)
+    return fields, expand & fields
+
+
+def model_columns(serializer_class, prefix=''):
+    '''Lookups of the model columns a ModelSerializer outputs, for only()'''
+    model = serializer_class.Meta.model
+    columns = []
+    for name in serializer_class.Meta.fields:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.is_relation:
+            columns.append(f'{prefix}{name}')
+    return columns
+
+
+class SparseFieldsMixin:
+    '''
+    Serializer output limited by ?fields=, relations from
+    Meta.expandable_fields not listed in ?expand= are rendered as primary
+    keys. Applies to GET requests of the top level serializer only.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        readable = [name for name, field in self.fields.items() if not field.write_only]
+        fields, expand = get_sparse_fields(request, readable, self.Meta.expandable_fields)
+        for name in readable:
+            if name not in fields:
+                del self.fields[name]
+            elif name in self.Meta.expandable_fields and name not in expand:
+                field = self.fields[name]
+                source = {'source': field.source} if field.source != name else {}
+                self.fields[name] = relations.PrimaryKeyRelatedField(
+                    read_only=True, many=isinstance(field, serializers.ListSerializer), **source)
+
+
+def build_row_encoder(keys, converters):
+    '''
+    Function turning a row tuple into a dict with given keys.
+    Converters is a list of (key, function) applied to not None values.
+    '''
+    if not converters:
+        return lambda row: dict(zip(keys, row))
+
+    def encode(row):
+        data = dict(zip(keys, row))
+        for key, convert in converters:
+            value = data[key]
+            if value is not None:
+                data[key] = convert(value)
+        return data
+    return encode
+
+
+class FlatSerializer:
+    '''
+    Read only serializer for hot list endpoints.
+
+    Rows are fetched with values_list() and turned into dicts by an
+    encoder compiled once per class from Meta.serializer, so the output
+    is the same as the one of that ModelSerializer without building model
+    instances and walking serializer fields for every row.
+    Meta.extra_fields are fetched too but not serialized, e.g. the
+    fields pagination needs for its cursor.
+    '''
+    _encoder = None
+    _sources = None
+
+    class Meta:
+        serializer = None
+        extra_fields = ()
+
+    def __init__(self, instance=None, many=True, **kwargs):
+        self.instance = instance
+
+    @classmethod
+    def compile(cls):
+        serializer_fields = cls.Meta.serializer().fields
+        keys, sources, converters = [], [], []
+        for key, field in serializer_fields.items():
+            if field.write_only:
+                continue
+            keys.append(key)
+            sources.append(field.source)
+            if not isinstance(field, PLAIN_FIELDS):
+                converters.append((key, field.to_representation))
+        cls._sources = (*sources, *getattr(cls.Meta, 'extra_fields', ()))
+        cls._encoder = build_row_encoder(tuple(keys), converters)
+
+    @classmethod
+    def get_encoder(cls):
+        if cls.__dict__.get('_encoder') is None:
+            cls.compile()
+        return cls._encoder
+
+    @classmethod
+    def values(cls, queryset):
+        '''Queryset of named rows with the columns needed by the serializer'''
+        cls.get_encoder()
+        return queryset.values_list(*cls._sources, named=True)
+
+    @property
+    def data(self):
+        encode = self.get_encoder()
+        return [encode(row) for row in self.instance]
+
+    @classmethod
+    def stream(cls, queryset, chunk_size):
+        '''
+        JSON array of the queryset as a generator of byte chunks. Rows are
+        read through a server side cursor and rendered chunk by chunk, so
+        memory does not grow with the size of the result.
+        '''
+        encode = cls.get_encoder()
+        renderer = JSONRenderer()
+        rows = cls.values(queryset).iterator(chunk_size=chunk_size)
+        yield b'['
+        separator = b''
+        for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+            yield separator + renderer.render([encode(row) for row in chunk])[1:-1]
+            separator = b','
+        yield b']'
@@ -1,4 +1,17 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from .cache import record, response_key
+from .media import MediaURLResolver, signed_url_window
+from .serializers import MEDIA_RESOLVER_CONTEXT_KEY
 
 
 class BaseListView(mixins.ListModelMixin, viewsets.GenericViewSet):
@@ -25,3 +38,116 @@ class BaseGetView(BaseListView, mixins.RetrieveModelMixin):
     queryset_brief = None
     serializer_class = None
     serializer_class_brief = None
+
+
+class CachedResponseMixin:
+    '''
+    Caches list and retrieve responses under a versioned namespace.
+    Responses with signed media URLs are kept shorter than the URLs live,
+    media_public views whose files are all served by MEDIA_PUBLIC_BASE_URL
+    are not limited.
+    '''
+    cache_namespace = None
+    cache_timeout = None
+    media_public = False
+
+    def get_cache_timeout(self):
+        timeout = self.cache_timeout if self.cache_timeout is not None else settings.RESPONSE_CACHE_TIMEOUT
+        if self.media_public and settings.MEDIA_PUBLIC_BASE_URL:
+            return timeout
+        window = signed_url_window()
+        return timeout if window is None else min(timeout, window)
+
+    def get_serializer_context(self):
+        # URLs of the cached response must not expire while it is served
+        context = super().get_serializer_context()
+        context[MEDIA_RESOLVER_CONTEXT_KEY] = MediaURLResolver(min_lifetime=self.get_cache_timeout())
+        return context
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key = response_key(self.cache_namespace, request, self.action, kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        data = cache.get(key)
+        record(self.cache_namespace, data is not None)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.get_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    '''
+    ETag computed from max(updated_at) and count of a queryset.
+    Last-Modified is not sent: max(updated_at) does not change when a row
+    is deleted or leaves the filter. When the storage signs media URLs the
+    ETag also changes every signed_url_window() seconds and the URLs are
+    resolved to live at least that long, so a 304 never keeps expired links.
+    Requests with volatile_query_params depend on rows outside the queryset
+    and are always answered in full.
+    '''
+    volatile_query_params = ()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        window = signed_url_window()
+        if window is not None:
+            context[MEDIA_RESOLVER_CONTEXT_KEY] = MediaURLResolver(min_lifetime=window)
+        return context
+
+    def check_not_modified(self, request, queryset, *parts, fields=()):
+        '''
+        Returns 304 response if the client copy is fresh, None otherwise.
+        fields are lookups of related rows embedded in the response,
+        their values are added to the ETag.
+        '''
+        if any(param in request.query_params for param in self.volatile_query_params):
+            return None
+        state = queryset.order_by().aggregate(
+            last_modified=Max('updated_at'), count=Count('pk'),
+            **{f'field_{i}': Max(field) for i, field in enumerate(fields)})
+        params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+        window = signed_url_window()
+        url_period = int(time.time() // window) if window is not None else None
+        digest = hashlib.md5(
+            repr((*state.values(), params, request.accepted_media_type, url_period,
+                  *parts)).encode(),
+            usedforsecurity=False
+        ).hexdigest()
+        etag = f'"{digest}"'
+        self.conditional_headers = {'ETag': etag}
+        return get_conditional_response(request, etag=etag)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        headers = getattr(self, 'conditional_headers', None)
+        if headers and response.status_code in (200, 304):
+            for header, value in headers.items():
+                response.headers.setdefault(header, value)
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+
+class StreamingListMixin:
+    '''Lets list actions send the whole result as a streamed JSON array'''
+    stream_query_param = 'stream'
+
+    def is_streaming(self, request):
+        return request.query_params.get(self.stream_query_param) in ('1', 'true', 'True')
+
+    def streaming_response(self, request, flat_serializer, queryset):
+        '''Unpaginated response in the ordering the paginator would use'''
+        queryset = queryset.order_by(*self.paginator.get_ordering(request))
+        return StreamingHttpResponse(
+            flat_serializer.stream(queryset, settings.STREAMING_CHUNK_SIZE),
+            content_type='application/json',
+        )
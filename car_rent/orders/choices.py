@@ -17,3 +17,6 @@ class ORDER_STATUSES(Choices):
         (REJECTED, "Отклонен"),
         (FINISHED, "Завершен")
     )
+
+    ACTIVE = (UNDER_CONSIDERATION, ACCEPTED, IN_PROGRESS)
+    BOOKED = (ACCEPTED, IN_PROGRESS)
@@ -0,0 +1,21 @@
+from django_filters import rest_framework as filters
+
+from .choices import ORDER_STATUSES
+from .models import Order
+
+
+class OrderFilterset(filters.FilterSet):
+    '''Filterset for orders'''
+    status = filters.MultipleChoiceFilter(choices=ORDER_STATUSES)
+    car_id = filters.NumberFilter(field_name='car')
+    created = filters.IsoDateTimeFromToRangeFilter(field_name='created_at')
+    desired_start = filters.IsoDateTimeFromToRangeFilter(field_name='desired_start_datetime')
+
+    class Meta:
+        model = Order
+        fields = [
+            'status',
+            'car_id',
+            'created',
+            'desired_start',
+        ]
@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class OrderQuerySet(models.QuerySet):
+    '''QuerySet of orders scoped to a side of the deal'''
+
+    def for_renter(self, user):
+        return self.filter(renter_id=user.id)
+
+    def for_lessor(self, user):
+        return self.filter(lessor_id=user.id)
+
+    def for_participant(self, user):
+        return self.filter(models.Q(renter_id=user.id) | models.Q(lessor_id=user.id))
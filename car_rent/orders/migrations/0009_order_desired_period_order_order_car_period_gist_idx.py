@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:30
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0022_car_search_indexes'),
+        ('orders', '0008_alter_order_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE EXTENSION IF NOT EXISTS btree_gist;',
+            reverse_sql='DROP EXTENSION IF EXISTS btree_gist;'
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='desired_period',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('desired_start_datetime'), models.F('desired_finish_datetime'), function='TSTZRANGE', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField(), verbose_name='Планируемый период аренды'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GistIndex(condition=models.Q(('status__in', ('UC', 'AD', 'IP'))), fields=['car', 'desired_period'], name='order_car_period_gist_idx'),
+        ),
+    ]
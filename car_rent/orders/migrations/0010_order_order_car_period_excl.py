@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:33
+
+import django.contrib.postgres.constraints
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0022_car_search_indexes'),
+        ('orders', '0009_order_desired_period_order_order_car_period_gist_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ('AD', 'IP'))), expressions=[('car', '='), ('desired_period', '&&')], name='order_car_period_excl', violation_error_message='Автомобиль уже забронирован на этот период'),
+        ),
+    ]
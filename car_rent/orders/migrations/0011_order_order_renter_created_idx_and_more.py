@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0022_car_search_indexes'),
+        ('orders', '0010_order_order_car_period_excl'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['renter', 'created_at', 'id'], name='order_renter_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['car', 'created_at', 'id'], name='order_car_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_order_lessor(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Car = apps.get_model('cars', 'Car')
+    owner = Car.objects.filter(pk=models.OuterRef('car_id')).values('owner_id')[:1]
+    last_id = 0
+    while True:
+        ids = list(Order.objects.filter(id__gt=last_id, lessor__isnull=True)
+                   .order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        Order.objects.filter(id__in=ids).update(lessor_id=models.Subquery(owner))
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('cars', '0022_car_search_indexes'),
+        ('orders', '0011_order_order_renter_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='lessor',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lessor_orders', to=settings.AUTH_USER_MODEL, verbose_name='Арендодатель'),
+        ),
+        migrations.RunPython(fill_order_lessor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_order_lessor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='lessor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lessor_orders', to=settings.AUTH_USER_MODEL, verbose_name='Арендодатель'),
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_car_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['lessor', 'created_at', 'id'], name='order_lessor_created_idx'),
+        ),
+    ]
@@ -1,3 +1,6 @@
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -6,6 +9,7 @@ from core.models import BaseAbstractModel
 from users.models import User
 from cars.models import Car
 from .choices import ORDER_STATUSES
+from .managers import OrderQuerySet
 
 
 class Order(BaseAbstractModel):
@@ -18,6 +22,11 @@ class Order(BaseAbstractModel):
         User, on_delete=models.CASCADE,
         verbose_name="Арендатор"
     )
+    lessor = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='lessor_orders',
+        verbose_name="Арендодатель"
+    )
     #  TODO: связь с чатом
 
     desired_finish_datetime = models.DateTimeField(
@@ -26,6 +35,15 @@ class Order(BaseAbstractModel):
     desired_start_datetime = models.DateTimeField(
         verbose_name="Планируемое время начала аренды"
     )
+    desired_period = models.GeneratedField(
+        expression=models.Func(
+            models.F('desired_start_datetime'), models.F('desired_finish_datetime'),
+            function='TSTZRANGE', output_field=DateTimeRangeField()
+        ),
+        output_field=DateTimeRangeField(),
+        db_persist=True,
+        verbose_name="Планируемый период аренды"
+    )
     start_rent_time = models.DateTimeField(
         verbose_name="фактическое время начала аренды",
         null=True, blank=True
@@ -50,6 +68,13 @@ class Order(BaseAbstractModel):
         verbose_name="Подтвердил ли арендодатель старт заказа"
     )
 
+    objects = OrderQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if self.lessor_id is None:
+            self.lessor_id = self.car.owner_id
+        super().save(*args, **kwargs)
+
     def clean(self) -> None:
         super().clean()
         if self.desired_start_datetime >= self.desired_finish_datetime:
@@ -59,3 +84,22 @@ class Order(BaseAbstractModel):
         db_table = 'order_table'
         app_label = 'orders'
         unique_together = ['renter', 'car']
+        indexes = [
+            models.Index(fields=['renter', 'created_at', 'id'], name='order_renter_created_idx'),
+            models.Index(fields=['lessor', 'created_at', 'id'], name='order_lessor_created_idx'),
+            GistIndex(
+                fields=['car', 'desired_period'], name='order_car_period_gist_idx',
+                condition=models.Q(status__in=ORDER_STATUSES.ACTIVE)
+            ),
+        ]
+        constraints = [
+            ExclusionConstraint(
+                name='order_car_period_excl',
+                expressions=[
+                    ('car', RangeOperators.EQUAL),
+                    ('desired_period', RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=ORDER_STATUSES.BOOKED),
+                violation_error_message="Автомобиль уже забронирован на этот период",
+            ),
+        ]
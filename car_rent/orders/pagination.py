@@ -0,0 +1,10 @@
+from core.pagination import KeysetPagination
+
+
+class OrderKeysetPagination(KeysetPagination):
+    '''Keyset pagination of orders by creation date'''
+    orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+    }
+    default_ordering = '-created_at'
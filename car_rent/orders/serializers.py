@@ -1,6 +1,8 @@
 import datetime
 from rest_framework import serializers, status
 
+from core.serializers import FlatSerializer
+
 from .models import Order
 from cars.serializers.model_serializers import CarSerializer
 
@@ -16,7 +18,12 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = '__all__'
+        exclude = ('desired_period',)
+
+
+class OrderFlatSerializer(FlatSerializer):
+    class Meta:
+        serializer = OrderSerializer
 
 
 class OrderRetriveSerializer(serializers.ModelSerializer):
@@ -24,7 +31,7 @@ class OrderRetriveSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = '__all__'
+        exclude = ('desired_period',)
 
 
 class OrderCreateSerializer(BaseOrderUpdsteSerializer):
@@ -0,0 +1,16 @@
+from cars.models import Car
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Order
+
+
+@receiver(post_save, sender=Car)
+def sync_order_lessor(sender, instance, created, update_fields=None, **kwargs):
+    '''Keeps the denormalized Order.lessor in line with the car owner'''
+    if created or update_fields is not None and not {'owner', 'owner_id'} & update_fields:
+        return
+    if getattr(instance, '_loaded_owner_id', None) == instance.owner_id:
+        return
+    Order.objects.filter(car=instance).exclude(lessor_id=instance.owner_id).update(lessor_id=instance.owner_id)
+    instance._loaded_owner_id = instance.owner_id
@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils import timezone
+
+from .choices import ORDER_STATUSES
+from .models import Order
+
+RENTER = 'renter'
+LESSOR = 'lessor'
+PARTICIPANT = 'participant'
+
+TRANSITIONS = {
+    'accept_order': (ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.ACCEPTED, LESSOR),
+    'reject_order': (ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.REJECTED, LESSOR),
+    'cancel_order': (ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.CANCELED, RENTER),
+}
+
+
+def _column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def _actor_condition(actor, user):
+    '''SQL condition restricting the update to orders the user acts on'''
+    renter = f'{_column(Order, "renter")} = %s'
+    lessor = f'{_column(Order, "lessor")} = %s'
+    if actor == RENTER:
+        return renter, [user.id]
+    if actor == LESSOR:
+        return lessor, [user.id]
+    return f'({renter} OR {lessor})', [user.id, user.id]
+
+
+def _update_order(pk, expected_status, actor, user, assignments, params):
+    '''
+    Runs UPDATE ... WHERE id = pk AND status = expected_status RETURNING *.
+
+    Returns the updated order or None when the order does not exist, is
+    not in the expected status or the user may not act on it.
+    '''
+    try:
+        pk = Order._meta.pk.to_python(pk)
+    except ValidationError:
+        return None
+    condition, condition_params = _actor_condition(actor, user)
+    sql = (
+        f'UPDATE {connection.ops.quote_name(Order._meta.db_table)} '
+        f'SET {", ".join(assignments)}, {_column(Order, "updated_at")} = %s '
+        f'WHERE {_column(Order, "id")} = %s AND {_column(Order, "status")} = %s AND {condition} '
+        f'RETURNING *'
+    )
+    params = [*params, timezone.now(), pk, expected_status, *condition_params]
+    return next(iter(Order.objects.raw(sql, params)), None)
+
+
+def change_status(transition, pk, user):
+    '''Moves the order along one of TRANSITIONS in a single query'''
+    expected_status, new_status, actor = TRANSITIONS[transition]
+    return _update_order(
+        pk, expected_status, actor, user,
+        [f'{_column(Order, "status")} = %s'], [new_status]
+    )
+
+
+def confirm_start(pk, user):
+    '''
+    Marks the start of rent as confirmed by the renter or by the lessor,
+    the order goes in progress once both of them have confirmed.
+    '''
+    renter = _column(Order, 'renter')
+    renter_confirmed = f'({_column(Order, "is_renter_start_order")} OR {renter} = %s)'
+    lessor_confirmed = f'({_column(Order, "is_lessor_start_order")} OR {renter} <> %s)'
+    return _update_order(
+        pk, ORDER_STATUSES.ACCEPTED, PARTICIPANT, user,
+        [
+            f'{_column(Order, "is_renter_start_order")} = {renter_confirmed}',
+            f'{_column(Order, "is_lessor_start_order")} = {lessor_confirmed}',
+            f'{_column(Order, "status")} = CASE WHEN {renter_confirmed} AND {lessor_confirmed} '
+            f'THEN %s ELSE {_column(Order, "status")} END',
+        ],
+        [user.id, user.id, user.id, user.id, ORDER_STATUSES.IN_PROGRESS],
+    )
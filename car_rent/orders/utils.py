@@ -2,7 +2,5 @@ from rest_framework import status
 from rest_framework.response import Response
 
 
-def check_order_status(order, expected_status, requested_status):
-    if order.status != expected_status:
-        return {"response": Response({"error": f"Для изменения на статус {requested_status}, заявка должна находиться в статусе {expected_status}"}, status=status.HTTP_409_CONFLICT)}
-    return {"response": None}
+def status_conflict_response(expected_status, requested_status):
+    return Response({"error": f"Для изменения на статус {requested_status}, заявка должна находиться в статусе {expected_status}"}, status=status.HTTP_409_CONFLICT)
@@ -1,4 +1,6 @@
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (OpenApiParameter, extend_schema,
@@ -8,19 +10,27 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from .permissions import IsOwnerRenterOrder, IsCarOwnerOrder, IsRenterOrder
+from core.schema import STREAM_PARAMETER
+from core.views import StreamingListMixin
+from .filtersets import OrderFilterset
+from .managers import OrderQuerySet
 from .models import Order
-from .serializers import OrderSerializer, OrderRetriveSerializer, OrderCreateSerializer, OrderUpdateSerializer
-from .utils import check_order_status
+from .pagination import OrderKeysetPagination
+from .serializers import (OrderSerializer, OrderRetriveSerializer, OrderCreateSerializer, OrderUpdateSerializer,
+                          OrderFlatSerializer)
+from .transitions import change_status, confirm_start
+from .utils import status_conflict_response
 from .choices import ORDER_STATUSES
 
 
 @extend_schema_view(
     list_lessor_orders=extend_schema(
         description="Список заказов арендодателя с возможностью фильтрации по конкретной машине",
+        filters=True,
         parameters=[
             OpenApiParameter(name='car_id', type=OpenApiTypes.INT, required=False, location=OpenApiParameter.QUERY,
-                             description='id автомобиля для получения заказов по нему')
+                             description='id автомобиля для получения заказов по нему'),
+            STREAM_PARAMETER,
         ],
         responses={
             status.HTTP_200_OK: OrderSerializer
@@ -28,6 +38,8 @@ from .choices import ORDER_STATUSES
     ),
     list_renter_orders=extend_schema(
         description="Получение списка своих заявок на аренду автомобилей от лица арендателя",
+        filters=True,
+        parameters=[STREAM_PARAMETER],
         responses={
             status.HTTP_200_OK: OrderSerializer
         }
@@ -178,9 +190,10 @@ from .choices import ORDER_STATUSES
         }
     )
 )
-class OrderViewSet(mixins.UpdateModelMixin, viewsets.GenericViewSet,
+class OrderViewSet(StreamingListMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet,
                    mixins.CreateModelMixin, mixins.RetrieveModelMixin):
     queryset = Order.objects.select_related('car', 'renter')
+    permission_classes = [IsAuthenticated]
     serializer_classes = {
         'retrieve': OrderRetriveSerializer,
         'list_lessor_orders': OrderSerializer,
@@ -189,35 +202,53 @@ class OrderViewSet(mixins.UpdateModelMixin, viewsets.GenericViewSet,
         'update': OrderUpdateSerializer,
         'partial_update': OrderUpdateSerializer
     }
-    permissions_classes = {
-        'retrieve': [IsOwnerRenterOrder],
-        'update': [IsRenterOrder],
-        'partial_update': [IsRenterOrder],
-        'accept_order': [IsCarOwnerOrder],
-        'reject_order': [IsCarOwnerOrder],
-        'cancel_order': [IsRenterOrder],
-        'start_rent': [IsOwnerRenterOrder]
+    action_scopes = {
+        'retrieve': OrderQuerySet.for_participant,
+        'update': OrderQuerySet.for_renter,
+        'partial_update': OrderQuerySet.for_renter,
+        'accept_order': OrderQuerySet.for_lessor,
+        'reject_order': OrderQuerySet.for_lessor,
+        'cancel_order': OrderQuerySet.for_renter,
+        'start_rent': OrderQuerySet.for_participant,
+    }
+    filterset_classes = {
+        'list_lessor_orders': OrderFilterset,
+        'list_renter_orders': OrderFilterset,
+    }
+    pagination_classes = {
+        'list_lessor_orders': OrderKeysetPagination,
+        'list_renter_orders': OrderKeysetPagination,
     }
 
     def get_serializer_class(self):
         return self.serializer_classes.get(self.action)
 
-    def get_permissions(self):
-        permissions = self.permissions_classes.get(self.action, [IsAuthenticated])
-        return [permission() for permission in permissions]
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        scope = self.action_scopes.get(self.action)
+        return scope(queryset, self.request.user) if scope is not None else queryset
+
+    @property
+    def filterset_class(self):
+        return self.filterset_classes.get(self.action)
+
+    @property
+    def pagination_class(self):
+        return self.pagination_classes.get(self.action)
 
     def create(self, request, *args, **kwargs):
         """Создание заказа"""
         serializer = self.get_serializer_class()
         serializer = serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        car = serializer.validated_data.get('car')
-        if Order.objects.filter(renter=request.user, car_id=car).exists():
+        try:
+            with transaction.atomic():
+                serializer.save(renter=request.user)
+        except IntegrityError:
             return Response(
                 {"error": "Вы уже создали заявку на этот автомобиль"},
                 status=status.HTTP_409_CONFLICT
             )
-        serializer.save(renter=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
@@ -234,78 +265,77 @@ class OrderViewSet(mixins.UpdateModelMixin, viewsets.GenericViewSet,
                 {"error": "Планируемое время начала аренды должно быть раньше времени окончания аренды"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        self.perform_update(serializer)
+        # условный UPDATE: одобрение между чтением и записью не затирается
+        updated = Order.objects.filter(pk=order.pk, status=ORDER_STATUSES.UNDER_CONSIDERATION).update(
+            **serializer.validated_data, updated_at=timezone.now())
+        if not updated:
+            return Response({"error": "нельзя изменить заявку после ее одобрения"}, status=status.HTTP_409_CONFLICT)
+        for field, value in serializer.validated_data.items():
+            setattr(order, field, value)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
-    def list_lessor_orders(self, request, car_id=None):
+    def list_lessor_orders(self, request):
         """Поулчение списка заказов на свои/ю машины/у"""
-        user = request.user
-        serializer = self.get_serializer_class()
-        car_id = request.query_params.get('car_id')
-        if car_id:
-            orders = Order.objects.filter(car__owner=user, car_id=car_id)
-        else:
-            orders = Order.objects.filter(car__owner=user)
-        data = serializer(orders, many=True).data
-        return Response(data, status=status.HTTP_200_OK)
+        orders = self.filter_queryset(Order.objects.for_lessor(request.user))
+        if self.is_streaming(request):
+            return self.streaming_response(request, OrderFlatSerializer, orders)
+        page = self.paginate_queryset(orders)
+        data = self.get_serializer_class()(page, many=True).data
+        return self.get_paginated_response(data)
 
     @action(detail=False, methods=['get'])
     def list_renter_orders(self, request):
         """Получение списка заказов оформленных юзером"""
-        user = request.user
-        serializer = self.get_serializer_class()
-        orders = Order.objects.filter(renter=user)
-        data = serializer(orders, many=True).data
-        return Response(data, status=status.HTTP_200_OK)
+        orders = self.filter_queryset(Order.objects.for_renter(request.user))
+        if self.is_streaming(request):
+            return self.streaming_response(request, OrderFlatSerializer, orders)
+        page = self.paginate_queryset(orders)
+        data = self.get_serializer_class()(page, many=True).data
+        return self.get_paginated_response(data)
 
     @action(detail=True, methods=['post'])
     def accept_order(self, request, pk=None):
-        order = self.get_object()
-        status_checker = check_order_status(order, ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.ACCEPTED)
-        if status_checker.get("response"):
-            return status_checker["response"]
-        order.status = ORDER_STATUSES.ACCEPTED
+        try:
+            with transaction.atomic():
+                order = change_status('accept_order', pk, request.user)
+        except IntegrityError:
+            return Response(
+                {"error": "Автомобиль уже забронирован на этот период"},
+                status=status.HTTP_409_CONFLICT
+            )
+        if order is None:
+            return self.status_conflict(ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.ACCEPTED)
         # TODO: добавить таску для отправки уведов
-        order.save()
         return Response({"ok": "Заказ подтвержден"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def reject_order(self, request, pk=None):
-        order = self.get_object()
-        status_checker = check_order_status(order, ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.REJECTED)
-        if status_checker.get("response"):
-            return status_checker["response"]
-        order.status = ORDER_STATUSES.REJECTED
+        order = change_status('reject_order', pk, request.user)
+        if order is None:
+            return self.status_conflict(ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.REJECTED)
         # TODO: добавить таску для отправки уведов
-        order.save()
         return Response({"ok": "Заказ отклонен"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def cancel_order(self, request, pk=None):
-        order = self.get_object()
-        status_checker = check_order_status(order, ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.CANCELED)
-        # TODO: рарешать ли отмену заказа после одобрения 
-        if status_checker.get("response"):
-            return status_checker["response"]
-        order.status = ORDER_STATUSES.CANCELED
+        # TODO: рарешать ли отмену заказа после одобрения
+        order = change_status('cancel_order', pk, request.user)
+        if order is None:
+            return self.status_conflict(ORDER_STATUSES.UNDER_CONSIDERATION, ORDER_STATUSES.CANCELED)
         # TODO: добавить таску для отправки уведов
-        order.save()
         return Response({"ok": "Заказ отменен"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def start_rent(self, request, pk=None):
-        order = self.get_object()
-        status_checker = check_order_status(order, ORDER_STATUSES.ACCEPTED, ORDER_STATUSES.IN_PROGRESS)
-        if status_checker.get("response"):
-            return status_checker["response"]
-        if request.user == order.renter:
-            order.is_renter_start_order = True
-        else:
-            order.is_lessor_start_order = True
-        if order.is_lessor_start_order and order.is_renter_start_order:
-            order.status = ORDER_STATUSES.IN_PROGRESS
-        order.save()
+        order = confirm_start(pk, request.user)
+        if order is None:
+            return self.status_conflict(ORDER_STATUSES.ACCEPTED, ORDER_STATUSES.IN_PROGRESS)
         # TODO: добавить уведы
         # TODO: Попиздеть с егором за ответы
         return Response({"ok": "вы подтвердили старт заказа"}, status=status.HTTP_200_OK)
+
+    def status_conflict(self, expected_status, requested_status):
+        """Ответ для заказа, который не удалось перевести в новый статус"""
+        self.get_object()
+        return status_conflict_response(expected_status, requested_status)
@@ -0,0 +1,11 @@
+from rest_framework.permissions import BasePermission
+
+from .choices import USER_ROLES
+
+
+class IsCompany(BasePermission):
+    '''Пермишен для аккаунтов компаний'''
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated
+                    and request.user.role == USER_ROLES.COMPANY)
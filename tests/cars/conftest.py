@@ -1,4 +1,11 @@
 import pytest
+from cars.catalog import catalog_index
+
+
+@pytest.fixture(autouse=True)
+def reset_catalog_index():
+    '''Index is per process, tests must not see catalog of each other'''
+    catalog_index.reset()
 
 
 @pytest.fixture
@@ -1,6 +1,15 @@
+from datetime import datetime, timedelta, timezone
+
 import pytest
-from cars.filtersets import BrandFilterset, CarModelFilterset
-from cars.models import Brand, CarModel
+from cars import choices
+from cars.filtersets import (BrandFilterset, CarFilterset, CarMapFilterset,
+                             CarModelFilterset)
+from cars.models import Brand, Car, CarModel
+from django.db import connection
+from orders.choices import ORDER_STATUSES
+
+from tests.factories.cars import CarModelFactory
+from tests.factories.orders import OrderFactory
 
 
 @pytest.mark.parametrize(
@@ -25,3 +34,149 @@ def test_carmodels_filterset(db, setup, data):
     params, count = data
     assert CarModelFilterset(
         queryset=CarModel.objects.all(), data=params).qs.count() == count
+
+
+@pytest.fixture()
+def cars(db, car_factory):
+    sedan = CarModelFactory(body_type=choices.BODY_TYPE_CHOCIES.SEDAN,
+                            gearbox=choices.GEARBOX_CHOICES.AUTOMATIC,
+                            type_of_fuel=choices.FUEL_TYPE_CHOICES.AI_95,
+                            drive=choices.DRIVE_CHOICES.FWD, hp=150)
+    suv = CarModelFactory(body_type=choices.BODY_TYPE_CHOCIES.SUV_5,
+                          gearbox=choices.GEARBOX_CHOICES.MANUAL,
+                          type_of_fuel=choices.FUEL_TYPE_CHOICES.DIESEL,
+                          drive=choices.DRIVE_CHOICES.AWD, hp=250)
+    car_factory(car_model=sedan, price=1000)
+    car_factory(car_model=sedan, price=3000)
+    car_factory(car_model=suv, price=5000)
+    car_factory(car_model=suv, price=2000,
+                status=choices.CAR_STATUS_CHOICES.NOT_VERIFIED)
+    return sedan, suv
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [{'min_price': 2000}, 2],
+        [{'min_price': 1000, 'max_price': 3000}, 2],
+        [{'body_type': [choices.BODY_TYPE_CHOCIES.SEDAN]}, 2],
+        [{'body_type': [choices.BODY_TYPE_CHOCIES.SEDAN, choices.BODY_TYPE_CHOCIES.SUV_5]}, 3],
+        [{'gearbox': [choices.GEARBOX_CHOICES.MANUAL]}, 1],
+        [{'type_of_fuel': [choices.FUEL_TYPE_CHOICES.AI_95], 'max_price': 2000}, 1],
+        [{'drive': [choices.DRIVE_CHOICES.AWD]}, 1],
+        [{'min_hp': 200}, 1],
+        [{'max_hp': 100}, 0],
+    ]
+)
+def test_cars_filterset(cars, data):
+    params, count = data
+    queryset = Car.objects.filter(status=choices.CAR_STATUS_CHOICES.VERIFIED)
+    assert CarFilterset(queryset=queryset, data=params).qs.count() == count
+
+
+def test_cars_filterset_brand(cars):
+    sedan, _ = cars
+    queryset = Car.objects.filter(status=choices.CAR_STATUS_CHOICES.VERIFIED)
+    filterset = CarFilterset(queryset=queryset, data={'brand': sedan.brand_id})
+    assert filterset.qs.count() == 2
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [{'min_price': 1000, 'max_price': 3000}, ['car_verified_price_idx']],
+        [{'body_type': [choices.BODY_TYPE_CHOCIES.SEDAN], 'gearbox': [choices.GEARBOX_CHOICES.AUTOMATIC]},
+         ['carmodel_body_gearbox_idx', 'car_verified_model_price_idx']],
+        [{'type_of_fuel': [choices.FUEL_TYPE_CHOICES.DIESEL], 'drive': [choices.DRIVE_CHOICES.AWD]},
+         ['carmodel_fuel_drive_idx', 'car_verified_model_price_idx']],
+        [{'min_hp': 200, 'max_price': 6000}, ['car_verified_model_price_idx']],
+    ]
+)
+def test_cars_filterset_query_plan(cars, data):
+    '''Common search combinations should be index scans'''
+    params, indexes = data
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    queryset = Car.objects.filter(status=choices.CAR_STATUS_CHOICES.VERIFIED)
+    plan = CarFilterset(queryset=queryset, data=params).qs.explain()
+    assert 'Seq Scan' not in plan
+    for index in indexes:
+        assert index in plan
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [{'available_after': '2030-01-01T10:00:00Z', 'available_before': '2030-01-01T12:00:00Z'}, 2],
+        [{'available_after': '2030-01-02T10:00:00Z', 'available_before': '2030-01-03T12:00:00Z'}, 3],
+        [{'available_after': '2030-01-01T10:30:00Z'}, 2],
+        [{'available_before': '2029-12-31T00:00:00Z'}, 3],
+    ]
+)
+def test_cars_filterset_available(cars, data):
+    params, count = data
+    busy, free_after_cancel = Car.objects.filter(
+        status=choices.CAR_STATUS_CHOICES.VERIFIED).order_by('id')[:2]
+    start = datetime(2030, 1, 1, 9, tzinfo=timezone.utc)
+    OrderFactory(car=busy, status=ORDER_STATUSES.ACCEPTED,
+                 desired_start_datetime=start,
+                 desired_finish_datetime=start + timedelta(hours=2))
+    OrderFactory(car=free_after_cancel, status=ORDER_STATUSES.CANCELED,
+                 desired_start_datetime=start,
+                 desired_finish_datetime=start + timedelta(hours=2))
+    queryset = Car.objects.filter(status=choices.CAR_STATUS_CHOICES.VERIFIED)
+    assert CarFilterset(queryset=queryset, data=params).qs.count() == count
+
+
+def test_cars_filterset_available_reversed(cars):
+    params = {'available_after': '2030-01-02T10:00:00Z', 'available_before': '2030-01-01T10:00:00Z'}
+    filterset = CarFilterset(queryset=Car.objects.all(), data=params)
+    assert not filterset.is_valid()
+    assert 'available' in filterset.errors
+
+
+def test_cars_filterset_available_query_plan(cars):
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    queryset = Car.objects.filter(status=choices.CAR_STATUS_CHOICES.VERIFIED)
+    params = {'available_after': '2030-01-01T10:00:00Z', 'available_before': '2030-01-01T12:00:00Z'}
+    plan = CarFilterset(queryset=queryset, data=params).qs.explain()
+    assert 'order_car_period_gist_idx' in plan
+
+
+@pytest.mark.parametrize(
+    'params',
+    [
+        {'min_lat': 55, 'max_lat': 56, 'min_lon': 37, 'max_lon': 38},
+        {'min_lat': 55, 'max_lat': 56, 'min_lon': 170, 'max_lon': -170},
+    ]
+)
+def test_cars_map_filterset_query_plan(cars, params):
+    '''The viewport is looked up in the GiST index of car locations'''
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    queryset = Car.objects.filter(status=choices.CAR_STATUS_CHOICES.VERIFIED)
+    plan = CarMapFilterset(queryset=queryset, data=params).qs.explain()
+    assert 'car_verified_location_idx' in plan
+
+
+@pytest.mark.parametrize(
+    'filterset, queryset, search, titles',
+    [
+        [BrandFilterset, Brand.objects.all(), 'Audy', ['AUDI']],
+        [BrandFilterset, Brand.objects.all(), 'bwm x', []],
+        [CarModelFilterset, CarModel.objects.all(), '320', ['320i']],
+    ]
+)
+def test_catalog_search_filterset(db, setup, filterset, queryset, search, titles):
+    qs = filterset(queryset=queryset, data={'search': search}).qs
+    assert list(qs.values_list('title', flat=True)) == titles
+
+
+@pytest.mark.parametrize('model, index', [[Brand, 'brand_title_gin_idx'], [CarModel, 'carmodel_title_gin_idx']])
+def test_catalog_search_uses_trigram_index(db, setup, model, index):
+    filterset = BrandFilterset if model is Brand else CarModelFilterset
+    qs = filterset(queryset=model.objects.all(), data={'search': 'AUDI'}).qs
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    assert index in qs.explain()
@@ -0,0 +1,67 @@
+import json
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from cars.models import Car
+from cars.serializers.flat_serializers import (CarListFlatSerializer,
+                                               CarMapFlatSerializer)
+from rest_framework.renderers import JSONRenderer
+
+from tests.factories.cars import CarModelFactory
+from tests.factories.users import UserFactory
+
+ROWS = 2000
+
+
+@pytest.fixture
+def many_cars(db):
+    car_model = CarModelFactory()
+    owner = UserFactory()
+    Car.objects.bulk_create(
+        Car(car_model=car_model, owner=owner, color='black', price=1000 + i,
+            score=Decimal(i % 500) / 100, latitude=55 + i / 1e4, longitude=37 + i / 1e4)
+        for i in range(ROWS)
+    )
+    return Car.objects.order_by('id')
+
+
+def rows_per_second(serialize, runs=3):
+    '''Best of several runs, a single run is too noisy on a busy machine'''
+    rates = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = len(serialize())
+        rates.append(rows / (time.perf_counter() - started))
+    return max(rates)
+
+
+@pytest.mark.parametrize('flat_serializer', [CarListFlatSerializer, CarMapFlatSerializer])
+def test_flat_serializer_output(many_cars, flat_serializer):
+    '''Быстрый сериалайзер отдает тот же JSON, что и ModelSerializer'''
+    queryset = many_cars[:50]
+    expected = JSONRenderer().render(flat_serializer.Meta.serializer(queryset, many=True).data)
+    actual = JSONRenderer().render(flat_serializer(flat_serializer.values(queryset)).data)
+    assert json.loads(actual) == json.loads(expected)
+    assert actual == expected
+
+
+@pytest.mark.parametrize('flat_serializer', [CarListFlatSerializer, CarMapFlatSerializer])
+def test_flat_serializer_rows(many_cars, flat_serializer, django_assert_num_queries):
+    '''Быстрый сериалайзер читает строки одним запросом без создания моделей'''
+    with patch.object(Car, '__init__', side_effect=AssertionError('model instance created')):
+        with django_assert_num_queries(1):
+            data = flat_serializer(list(flat_serializer.values(many_cars))).data
+    assert len(data) == ROWS
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('flat_serializer', [CarListFlatSerializer, CarMapFlatSerializer])
+def test_flat_serializer_benchmark(many_cars, flat_serializer):
+    '''Строк в секунду: выборка и сериализация, ModelSerializer против values_list (pytest -m benchmark)'''
+    serializer = flat_serializer.Meta.serializer
+    model_rate = rows_per_second(lambda: serializer(list(many_cars), many=True).data)
+    flat_rate = rows_per_second(lambda: flat_serializer(list(flat_serializer.values(many_cars))).data)
+    assert flat_rate > model_rate, (
+        f'{serializer.__name__}: {model_rate:.0f} rows/s, {flat_serializer.__name__}: {flat_rate:.0f} rows/s')
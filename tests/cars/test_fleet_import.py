@@ -0,0 +1,164 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from cars.fleet_import import sign_fleet_import
+from cars.models import Car, CarOption
+from cars.tasks import import_fleet_file
+from cars.utils import encode_geohash
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from users.choices import USER_ROLES
+
+CSV_HEADER = 'car_model,brand,model,color,price,latitude,longitude,options\n'
+
+
+@pytest.fixture
+def company(db):
+    return get_user_model().objects.create_user(
+        username='company', password='password', email='company@user.ru', role=USER_ROLES.COMPANY)
+
+
+@pytest.fixture
+def company_client(company):
+    client_instance = APIClient()
+    client_instance.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(company)}')
+    return client_instance
+
+
+@pytest.fixture
+def fleet_csv(car_model):
+    return (
+        CSV_HEADER
+        + f'{car_model.pk},,,red,3000,55.75,37.61,Кондиционер|Навигатор\n'
+        + f',{car_model.brand.title.upper()},{car_model.title.lower()},blue,2500,-33.86,151.2,\n'
+        + f'{car_model.pk},,,black,-1,55.75,37.61,\n'
+        + ',Unknown,Model,white,1000,10,10,\n'
+        + f'{car_model.pk},,,green,4000,59.93,30.33,\n'
+    )
+
+
+def import_file(client, name, content, **data):
+    file = SimpleUploadedFile(name, content.encode())
+    return client.post(reverse('cars:car-import-view'), {'file': file, **data}, format='multipart')
+
+
+def test_import_csv(company, company_client, car_model, fleet_csv):
+    response = import_file(company_client, 'fleet.csv', fleet_csv)
+    assert response.status_code == status.HTTP_201_CREATED
+    report = response.json()
+    assert report['total'] == 5
+    assert report['created'] == 3
+    assert report['failed'] == 2
+    assert [error['row'] for error in report['errors']] == [4, 5]
+    assert 'price' in report['errors'][0]['errors']
+    assert 'car_model' in report['errors'][1]['errors']
+    cars = Car.objects.filter(owner=company).order_by('id')
+    assert [car.color for car in cars] == ['red', 'blue', 'green']
+    assert all(car.car_model_id == car_model.pk for car in cars)
+    assert all(car.geohash == encode_geohash(car.latitude, car.longitude) for car in cars)
+    assert sorted(CarOption.objects.filter(car=cars[0]).values_list('option', flat=True)) == [
+        'Кондиционер', 'Навигатор']
+
+
+def test_import_json_lines(company, company_client, car_model):
+    lines = [
+        json.dumps({'car_model': car_model.pk, 'color': 'red', 'price': 3000,
+                    'latitude': 55.75, 'longitude': 37.61, 'options': ['Люк']}),
+        '',
+        'not json',
+        json.dumps({'color': 'red', 'price': 3000, 'latitude': 55.75, 'longitude': 37.61}),
+    ]
+    response = import_file(company_client, 'fleet.ndjson', '\n'.join(lines))
+    assert response.status_code == status.HTTP_201_CREATED
+    report = response.json()
+    assert (report['total'], report['created'], report['failed']) == (3, 1, 2)
+    assert [error['row'] for error in report['errors']] == [3, 4]
+    assert CarOption.objects.get(car__owner=company).option == 'Люк'
+
+
+def test_import_json_array(company, company_client, car_model):
+    rows = [
+        {'car_model': car_model.pk, 'color': 'red', 'price': 3000, 'latitude': 55.75, 'longitude': 37.61},
+        'not object',
+        {'car_model': car_model.pk, 'color': 'blue', 'price': 2500, 'latitude': 59.93, 'longitude': 30.33},
+    ]
+    response = import_file(company_client, 'fleet.json', json.dumps(rows, indent=2))
+    assert response.status_code == status.HTTP_201_CREATED
+    report = response.json()
+    assert (report['total'], report['created'], report['failed']) == (3, 2, 1)
+    assert [error['row'] for error in report['errors']] == [2]
+    assert set(Car.objects.filter(owner=company).values_list('color', flat=True)) == {'red', 'blue'}
+
+
+def test_import_json_array_broken(company_client, car_model):
+    response = import_file(company_client, 'fleet.json', '[\n  {"color": "red"},\n')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    report = response.json()
+    assert report['error'].startswith('Не удалось прочитать файл')
+
+
+def test_import_queries_do_not_grow(company_client, car_model):
+    row = f'{car_model.pk},,,red,3000,55.75,37.61,Люк\n'
+    counts = []
+    for rows in (5, 50):
+        with CaptureQueriesContext(connection) as queries:
+            response = import_file(company_client, 'fleet.csv', CSV_HEADER + row * rows)
+        assert response.json()['created'] == rows
+        counts.append(len(queries))
+    assert counts[0] == counts[1]
+
+
+def test_import_access(user_client, company_client):
+    response = import_file(user_client, 'fleet.csv', CSV_HEADER)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = import_file(company_client, 'fleet.xlsx', CSV_HEADER)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_import_large_file_queued(settings, company, company_client, fleet_csv):
+    settings.FLEET_IMPORT_SYNC_MAX_SIZE = 10
+    with patch.object(import_fleet_file, 'delay', return_value=MagicMock(id='task-id')) as delay:
+        response = import_file(company_client, 'fleet.csv', fleet_csv)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    owner_id, name, file_format = delay.call_args.args
+    assert (owner_id, file_format) == (company.pk, 'csv')
+    assert default_storage.exists(name)
+    default_storage.delete(name)
+
+    url = reverse('cars:car-import-status-view')
+    report = {'total': 5, 'created': 3, 'failed': 2, 'errors': [], 'error': None}
+    result = MagicMock(state='SUCCESS', info=report, result=report)
+    with patch('cars.views.AsyncResult', return_value=result) as async_result:
+        response = company_client.get(url, {'id': response.json()['id']})
+        async_result.assert_called_once_with('task-id')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['state'] == 'SUCCESS'
+        assert response.json()['report']['created'] == 3
+        assert company_client.get(url, {'id': 'forged'}).status_code == status.HTTP_404_NOT_FOUND
+        foreign = sign_fleet_import('task-id', company.pk + 1)
+        assert company_client.get(url, {'id': foreign}).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_import_fleet_file_task(company, car_model, fleet_csv):
+    name = default_storage.save('fleet_imports/fleet.csv', ContentFile(fleet_csv.encode()))
+    report = import_fleet_file.apply(args=(company.pk, name, 'csv')).get()
+    assert (report['created'], report['failed']) == (3, 2)
+    assert Car.objects.filter(owner=company).count() == 3
+    assert not default_storage.exists(name)
+
+
+def test_import_fleet_command(tmp_path, company, car_model, fleet_csv):
+    path = tmp_path / 'fleet.csv'
+    path.write_text(fleet_csv, encoding='utf-8')
+    call_command('import_fleet', str(path), owner=company.username, batch_size=2)
+    assert Car.objects.filter(owner=company).count() == 3
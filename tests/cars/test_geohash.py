@@ -0,0 +1,35 @@
+import pytest
+from cars.models import Car
+from cars.utils import encode_geohash
+from django.core.management import call_command
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [(57.64911, 10.40744, 11), 'u4pruydqqvj'],
+        [(55.7558, 37.6173, 5), 'ucfv0'],
+        [(-33.8688, 151.2093, 6), 'r3gx2f'],
+    ]
+)
+def test_encode_geohash(data):
+    args, geohash = data
+    assert encode_geohash(*args) == geohash
+
+
+def test_car_geohash_on_save(db, car_factory):
+    car = car_factory(latitude=55.7558, longitude=37.6173)
+    assert car.geohash.startswith('ucfv0')
+    car.latitude, car.longitude = -33.8688, 151.2093
+    car.save(update_fields=['latitude', 'longitude'])
+    car.refresh_from_db()
+    assert car.geohash.startswith('r3gx2f')
+
+
+def test_backfill_car_geohash(db, car_factory):
+    cars = car_factory.create_batch(5)
+    Car.objects.update(geohash='')
+    call_command('backfill_car_geohash', batch_size=2)
+    for car in cars:
+        geohash = Car.objects.values_list('geohash', flat=True).get(pk=car.pk)
+        assert geohash == encode_geohash(car.latitude, car.longitude)
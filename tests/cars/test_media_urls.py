@@ -0,0 +1,97 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from cars.catalog import build_index
+from cars.serializers.model_serializers import (BrandSerializer,
+                                                CarPhotoSerializer)
+from core.media import MediaURLResolver
+from core.serializers import MEDIA_RESOLVER_CONTEXT_KEY
+from storages.backends.s3boto3 import S3Boto3Storage
+
+
+class CountingStorage(S3Boto3Storage):
+    '''S3 storage of a local MinIO counting signed URLs'''
+    signed = 0
+
+    def url(self, name, *args, **kwargs):
+        CountingStorage.signed += 1
+        return super().url(name, *args, **kwargs)
+
+
+@pytest.fixture
+def storage():
+    CountingStorage.signed = 0
+    return CountingStorage(
+        access_key='minioadmin', secret_key='minioadmin', bucket_name='carrentino',
+        endpoint_url='http://localhost:9000', querystring_expire=600)
+
+
+def test_signed_urls_cached(storage):
+    names = ['cars/a.jpg', 'cars/b.jpg', 'cars/a.jpg']
+    resolver = MediaURLResolver(storage)
+    resolver.resolve(names)
+    assert storage.signed == 2
+    url = resolver.url('cars/a.jpg')
+    assert url.startswith('http://localhost:9000/carrentino/cars/a.jpg?')
+    # новый ответ берет подписанные ссылки из кеша
+    other = MediaURLResolver(storage)
+    other.resolve(names)
+    assert storage.signed == 2
+    assert other.url('cars/a.jpg') == url
+
+
+def test_signed_urls_min_lifetime(monkeypatch, storage):
+    MediaURLResolver(storage).resolve(['cars/a.jpg'])
+    assert storage.signed == 1
+    # через 200 секунд ссылке осталось жить 400 секунд
+    now = time.time() + 200
+    monkeypatch.setattr('core.media.time.time', lambda: now)
+    MediaURLResolver(storage).resolve(['cars/a.jpg'])
+    assert storage.signed == 1
+    MediaURLResolver(storage, min_lifetime=500).resolve(['cars/a.jpg'])
+    assert storage.signed == 2
+
+
+def test_catalog_index_urls_outlive_index(db, settings):
+    settings.CATALOG_INDEX_MAX_AGE = 1800
+    with patch('cars.catalog.MediaURLResolver') as resolver:
+        build_index()
+    resolver.assert_called_once_with(min_lifetime=1800)
+
+
+def test_public_urls(settings, storage):
+    settings.MEDIA_PUBLIC_BASE_URL = 'https://cdn.carrentino.ru/media/'
+    resolver = MediaURLResolver(storage)
+    assert resolver.url('brands/bmw logo.jpg', public=True) == 'https://cdn.carrentino.ru/media/brands/bmw%20logo.jpg'
+    assert resolver.url('cars/a.jpg').startswith('http://localhost:9000/')
+    assert storage.signed == 1
+
+
+def test_photo_serializers_public_urls(db, settings, brand, brand_photo_factory, car_photo_factory):
+    settings.MEDIA_PUBLIC_BASE_URL = 'https://cdn.carrentino.ru'
+    photo = brand_photo_factory(brand=brand, variants={'320': 'brands/logo_320.webp'})
+    data = BrandSerializer(brand).data['photos'][0]
+    assert data['photo'] == f'https://cdn.carrentino.ru/{photo.photo.name}'
+    assert data['variants'] == {'320': 'https://cdn.carrentino.ru/brands/logo_320.webp'}
+    # фото автомобилей не публичные
+    car_photo = car_photo_factory()
+    assert not CarPhotoSerializer(car_photo).data['photo'].startswith('https://cdn.carrentino.ru')
+
+
+def test_photo_urls_resolved_in_batch(db, storage, brand, brand_photo_factory):
+    brand_photo_factory.create_batch(
+        3, brand=brand, variants={'320': 'brands/a_320.webp', '640': 'brands/a_640.webp'})
+    resolver = MediaURLResolver(storage)
+    batches = []
+    resolve = resolver.resolve
+
+    def record_batch(names, public=False):
+        batches.append(list(names))
+        resolve(names, public)
+    resolver.resolve = record_batch
+    data = BrandSerializer(brand, context={MEDIA_RESOLVER_CONTEXT_KEY: resolver}).data
+    assert len(data['photos']) == 3
+    assert len(batches) == 1
+    assert len(batches[0]) == 9
+    assert storage.signed == 5
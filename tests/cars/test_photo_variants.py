@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+import pytest
+from cars.choices import PHOTO_VARIANTS_STATUS_CHOICES
+from cars.models import BrandPhoto, CarPhoto
+from cars.photos import variant_name
+from cars.tasks import build_photo_variants
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+
+
+@pytest.fixture(autouse=True)
+def variant_widths(settings):
+    settings.PHOTO_VARIANT_WIDTHS = [32, 64, 1280]
+
+
+def test_variant_name():
+    assert variant_name('cars/photo.jpg', 320) == 'cars/photo_320.webp'
+
+
+def test_build_photo_variants(db, brand_photo_factory):
+    # фабрика создает jpeg 100x100, 1280 шире оригинала и пропускается
+    photo = brand_photo_factory()
+    variants = build_photo_variants.apply(args=('cars.BrandPhoto', photo.pk)).get()
+    photo.refresh_from_db()
+    assert photo.variants_status == PHOTO_VARIANTS_STATUS_CHOICES.READY
+    assert photo.variants == variants
+    assert list(variants) == ['32', '64']
+    for width, name in variants.items():
+        with default_storage.open(name) as file, Image.open(file) as image:
+            assert image.format == 'WEBP'
+            assert image.size == (int(width), int(width))
+
+
+def test_build_photo_variants_of_not_image(db, car_photo_factory):
+    photo = car_photo_factory()
+    build_photo_variants.apply(args=('cars.CarPhoto', photo.pk))
+    photo.refresh_from_db()
+    assert photo.variants_status == PHOTO_VARIANTS_STATUS_CHOICES.FAILED
+    assert photo.variants == {}
+
+
+def test_build_photo_variants_unexpected_error(db, brand_photo_factory):
+    photo = brand_photo_factory()
+    with patch('cars.tasks.build_variants', side_effect=RuntimeError):
+        result = build_photo_variants.apply(args=('cars.BrandPhoto', photo.pk))
+    assert isinstance(result.result, RuntimeError)
+    photo.refresh_from_db()
+    assert photo.variants_status == PHOTO_VARIANTS_STATUS_CHOICES.FAILED
+
+
+def test_variants_scheduled_on_commit(db, brand_photo_factory, django_capture_on_commit_callbacks):
+    with patch.object(build_photo_variants, 'delay') as delay:
+        with django_capture_on_commit_callbacks(execute=True):
+            photo = brand_photo_factory()
+        photo.save()
+    delay.assert_called_once_with('cars.BrandPhoto', photo.pk)
+
+
+def test_car_photo_variants_in_response(user_client, user, car_factory, car_photo_factory):
+    car = car_factory(owner=user)
+    photo = car_photo_factory(car=car, variants={'320': 'cars/photo_320.webp'},
+                              variants_status=PHOTO_VARIANTS_STATUS_CHOICES.READY)
+    response = user_client.get(reverse('cars:car-detail', args=[car.pk]))
+    data = response.data['photos'][0]
+    assert data['id'] == photo.pk
+    assert data['variants'] == {'320': default_storage.url('cars/photo_320.webp')}
+    assert data['variants_status'] == PHOTO_VARIANTS_STATUS_CHOICES.READY
+
+
+def test_backfill_photo_variants(db, brand_photo_factory, car_photo_factory):
+    pending = brand_photo_factory.create_batch(3)
+    ready = brand_photo_factory(variants_status=PHOTO_VARIANTS_STATUS_CHOICES.READY)
+    call_command('backfill_photo_variants', model=['brand'], batch_size=2, sync=True)
+    for photo in pending:
+        photo.refresh_from_db()
+        assert photo.variants_status == PHOTO_VARIANTS_STATUS_CHOICES.READY
+        assert list(photo.variants) == ['32', '64']
+    ready.refresh_from_db()
+    assert ready.variants == {}
+    assert BrandPhoto.objects.count() == 4
+    assert CarPhoto.objects.count() == 0
@@ -1,5 +1,7 @@
 import pytest
 from cars import models
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
@@ -46,7 +48,7 @@ def test_access_user_cars(data, request, user_client, client, misha_client, mish
         response = user.get(rev_url)
         assert response.status_code == code
         if response.status_code == status.HTTP_200_OK:
-            assert len(response.json()) == count
+            assert len(response.json()['results']) == count
 
 
 @pytest.mark.parametrize(
@@ -132,7 +134,7 @@ def test_access_option_create(data, request, user_client, client, misha, misha_c
     rev_url = reverse(url, args=[getattr(obj, attr)])
     for user, code in [
         (client, status.HTTP_401_UNAUTHORIZED),
-        (user_client, status.HTTP_403_FORBIDDEN),
+        (user_client, status.HTTP_404_NOT_FOUND),
         (misha_client, status.HTTP_201_CREATED),
     ]:
         response = user.post(rev_url, data=req)
@@ -163,7 +165,7 @@ def test_access_photo_create(data, request, mock_image, user_client, client, mis
     rev_url = reverse(url, args=[getattr(obj, attr)])
     for user, code in [
         (client, status.HTTP_401_UNAUTHORIZED),
-        (user_client, status.HTTP_403_FORBIDDEN),
+        (user_client, status.HTTP_404_NOT_FOUND),
         (misha_client, status.HTTP_201_CREATED),
     ]:
         response = user.post(rev_url, data=req, format=req_format)
@@ -192,7 +194,7 @@ def test_access_cars_update(data, request, user_client, client, misha, misha_cli
     rev_url = reverse(url, args=[getattr(obj, attr)])
     for user, code in [
         (client, status.HTTP_401_UNAUTHORIZED),
-        (user_client, status.HTTP_403_FORBIDDEN),
+        (user_client, status.HTTP_404_NOT_FOUND),
         (misha_client, status.HTTP_200_OK)
     ]:
         response = user.patch(rev_url, data=req)
@@ -216,7 +218,7 @@ def test_access_cars_delete(data, request, user_client, client, misha, misha_cli
     rev_url = reverse(url, args=[getattr(obj, attr)])
     for user, code in [
         (client, status.HTTP_401_UNAUTHORIZED),
-        (user_client, status.HTTP_403_FORBIDDEN),
+        (user_client, status.HTTP_404_NOT_FOUND),
         (misha_client, status.HTTP_204_NO_CONTENT),
     ]:
         response = user.delete(rev_url)
@@ -249,3 +251,36 @@ def test_access_photo_option_delete(data, request, user_client, client, misha, m
     ]:
         response = user.delete(rev_url)
         assert response.status_code == code
+
+
+@pytest.mark.parametrize(
+    'url, method, data, is_owner, code, queries',
+    [
+        ['cars:car-detail', 'patch', {'color': 'white'}, False, status.HTTP_404_NOT_FOUND, 2],
+        ['cars:car-add-option', 'post', {'option': 'option'}, True, status.HTTP_201_CREATED, 4],
+        ['cars:car-add-option', 'post', {'option': 'option'}, False, status.HTTP_404_NOT_FOUND, 2],
+        ['cars:car-detail', 'delete', None, True, status.HTTP_204_NO_CONTENT, 6],
+    ]
+)
+def test_access_cars_queries(url, method, data, is_owner, code, queries,
+                             car_factory, user_client, misha, misha_client):
+    '''Права проверяются в WHERE запроса объекта, без догрузки связей'''
+    obj = car_factory(owner=misha)
+    client = misha_client if is_owner else user_client
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(reverse(url, args=[obj.pk]), data=data)
+    assert response.status_code == code
+    assert len(context.captured_queries) == queries
+
+
+def test_access_cars_retrieve_not_verified(car_factory, user_client, misha, misha_client, client):
+    '''Непроверенный автомобиль виден только владельцу'''
+    obj = car_factory(owner=misha, status=models.CAR_STATUS_CHOICES.NOT_VERIFIED)
+    rev_url = reverse('cars:car-detail', args=[obj.pk])
+    for user, code in [
+        (client, status.HTTP_404_NOT_FOUND),
+        (user_client, status.HTTP_404_NOT_FOUND),
+        (misha_client, status.HTTP_200_OK),
+    ]:
+        response = user.get(rev_url)
+        assert response.status_code == code
@@ -1,6 +1,16 @@
+import base64
+import json
+from datetime import timedelta
+
+import msgpack
 import pytest
-from cars import models
+from cars import catalog, models
+from cars.utils import CATALOG_CACHE_NAMESPACE
+from cars.views import BrandView
+from core.cache import get_stats
+from core.serializers import MEDIA_RESOLVER_CONTEXT_KEY
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from car_rent.cars import choices
@@ -146,3 +156,441 @@ def test_advanced_car_validators_create(data, user_client, car_model_factory):
         'Ensure this value is greater than or equal to 0.']
     if response.status_code == status.HTTP_400_BAD_REQUEST:
         model.objects.filter(id=response.data.get('id')).delete()
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [{}, 4],
+        [{'min_lat': 55, 'max_lat': 56, 'min_lon': 37, 'max_lon': 38}, 1],
+        [{'min_lat': 50, 'max_lat': 60, 'min_lon': 30, 'max_lon': 40}, 2],
+        [{'min_lat': 10, 'max_lat': 20}, 0],
+        [{'min_lon': 150, 'max_lon': -170}, 2],
+        [{'min_lat': -40, 'max_lat': -30, 'min_lon': 170, 'max_lon': 160}, 1],
+        [{'min_lat': 56, 'max_lat': 55}, 0],
+    ]
+)
+def test_advanced_cars_map_viewport(data, db, client, car_factory):
+    '''Тест фильтрации автомобилей на карте по видимой области'''
+    params, count = data
+    car_factory(latitude=55.75, longitude=37.61)
+    car_factory(latitude=59.93, longitude=30.33)
+    car_factory(latitude=-33.86, longitude=151.2)
+    car_factory(latitude=64.73, longitude=177.5)
+    car_factory(latitude=55.75, longitude=37.61,
+                status=choices.CAR_STATUS_CHOICES.NOT_VERIFIED)
+    response = client.get(reverse('cars:car-map-view'), data=params)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == count
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [{'zoom': 3}, ['latitude', 'longitude', 'count', 'min_price'], 2],
+        [{'zoom': 20}, ['id', 'latitude', 'longitude'], 3],
+    ]
+)
+def test_advanced_cars_map_clusters(data, db, client, car_factory):
+    '''Тест кластеризации автомобилей на карте по масштабу'''
+    params, fields, count = data
+    car_factory(latitude=55.75, longitude=37.61, price=1000)
+    car_factory(latitude=55.76, longitude=37.62, price=500)
+    car_factory(latitude=-33.86, longitude=151.2, price=700)
+    response = client.get(reverse('cars:car-map-view'), data=params)
+    assert response.status_code == status.HTTP_200_OK
+    json_data = response.json()
+    assert len(json_data) == count
+    assert set(json_data[0].keys()) == set(fields)
+    if 'count' in fields:
+        moscow = max(json_data, key=lambda cluster: cluster['count'])
+        assert moscow['count'] == 2
+        assert moscow['min_price'] == 500
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [{'latitude': 55.75, 'longitude': 37.61, 'k': 2}, [0, 1]],
+        [{'latitude': 59.9, 'longitude': 30.3, 'k': 1}, [2]],
+        [{'latitude': 59.9, 'longitude': 30.3, 'k': 10}, [2, 1, 0, 3]],
+    ]
+)
+def test_advanced_cars_nearest(data, db, client, car_factory):
+    '''Тест поиска ближайших автомобилей'''
+    params, order = data
+    cars = [
+        car_factory(latitude=55.751, longitude=37.612),
+        car_factory(latitude=55.7, longitude=37.5),
+        car_factory(latitude=59.93, longitude=30.33),
+        car_factory(latitude=-33.86, longitude=151.2),
+    ]
+    car_factory(latitude=55.75, longitude=37.61,
+                status=choices.CAR_STATUS_CHOICES.NOT_VERIFIED)
+    response = client.get(reverse('cars:car-nearest-view'), data=params)
+    assert response.status_code == status.HTTP_200_OK
+    json_data = response.json()
+    assert [car['id'] for car in json_data] == [cars[i].id for i in order]
+    distances = [car['distance'] for car in json_data]
+    assert distances == sorted(distances)
+
+
+def test_advanced_cars_nearest_validation(db, client):
+    response = client.get(reverse('cars:car-nearest-view'),
+                          data={'latitude': 100, 'longitude': 37.61})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [{}, lambda car: (-car.created_at.timestamp(), -car.id)],
+        [{'ordering': 'price'}, lambda car: (car.price, car.id)],
+        [{'ordering': '-price'}, lambda car: (-car.price, -car.id)],
+    ]
+)
+def test_advanced_cars_list_pagination(data, db, client, car_factory):
+    '''Тест постраничного вывода автомобилей по курсору'''
+    params, key = data
+    cars = [car_factory(price=price) for price in [300, 100, 200, 100, 300, 100, 500]]
+    car_factory(status=choices.CAR_STATUS_CHOICES.NOT_VERIFIED)
+    ids = []
+    url = reverse('cars:car-list-view')
+    params = {**params, 'page_size': 3}
+    while url:
+        response = client.get(url, data=params)
+        assert response.status_code == status.HTTP_200_OK
+        json_data = response.json()
+        assert len(json_data['results']) <= 3
+        ids += [car['id'] for car in json_data['results']]
+        url, params = json_data['next'], None
+    assert ids == [car.id for car in sorted(cars, key=key)]
+
+
+@pytest.mark.parametrize('ordering', ['-created_at', 'created_at'])
+def test_advanced_cars_list_pagination_same_millisecond(ordering, db, client, user, car_model, car_factory):
+    '''Курсор не теряет микросекунды created_at'''
+    cars = car_factory.create_batch(4, car_model=car_model, owner=user)
+    created_at = timezone.now().replace(microsecond=123000)
+    for i, car in enumerate(cars):
+        models.Car.objects.filter(pk=car.pk).update(created_at=created_at + timedelta(microseconds=i * 100))
+    expected = [car.id for car in cars]
+    if ordering.startswith('-'):
+        expected.reverse()
+    ids = []
+    url, params = reverse('cars:car-list-view'), {'ordering': ordering, 'page_size': 1}
+    while url and len(ids) <= len(cars):
+        json_data = client.get(url, data=params).json()
+        ids += [car['id'] for car in json_data['results']]
+        url, params = json_data['next'], None
+    assert ids == expected
+
+
+def test_advanced_cars_list_invalid_cursor(db, client):
+    response = client.get(reverse('cars:car-list-view'), data={'cursor': 'invalid'})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize('url, params', [
+    ('cars:car-list-view', {}),
+    ('cars:car-map-view', {}),
+    ('cars:car-nearest-view', {'latitude': 55.75, 'longitude': 37.61}),
+])
+def test_advanced_cars_available_reversed(db, client, car_factory, url, params):
+    car_factory(latitude=55.75, longitude=37.61)
+    params = {**params, 'available_after': '2030-01-02T10:00:00Z', 'available_before': '2030-01-01T10:00:00Z'}
+    response = client.get(reverse(url), data=params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'available' in response.data
+
+
+@pytest.mark.parametrize('ordering, values', [
+    (None, ['abc', 1]),
+    (None, [None, 1]),
+    (None, [{}, 1]),
+    (None, ['2024-01-01T00:00:00', 'x']),
+    (None, ['2024-01-01T00:00:00', None]),
+    ('price', [[], 1]),
+    ('price', ['abc', 1]),
+])
+def test_advanced_cars_list_invalid_cursor_values(db, client, ordering, values):
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    data = {'cursor': cursor}
+    if ordering:
+        data['ordering'] = ordering
+    response = client.get(reverse('cars:car-list-view'), data=data)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize('url', ['cars:brand-list', 'cars:car-model-list'])
+def test_catalog_cache(url, db, client, car_model):
+    '''Кеш каталога: повторный запрос из кеша, изменение каталога сбрасывает кеш'''
+    rev_url = reverse(url)
+    assert client.get(rev_url)['X-Cache'] == 'MISS'
+    assert client.get(rev_url)['X-Cache'] == 'HIT'
+    assert client.get(rev_url, {'brief': True})['X-Cache'] == 'MISS'
+    car_model.brand.title = 'Lada'
+    car_model.brand.save()
+    response = client.get(rev_url)
+    assert response['X-Cache'] == 'MISS'
+    assert 'Lada' in response.content.decode()
+    stats = get_stats(CATALOG_CACHE_NAMESPACE)
+    assert (stats['hits'], stats['misses']) == (1, 3)
+
+
+def test_catalog_cache_timeout_signed_urls(settings, monkeypatch):
+    '''Ответы с подписанными ссылками кешируются меньше, чем живут ссылки'''
+    settings.RESPONSE_CACHE_TIMEOUT = 86400
+    settings.MEDIA_PUBLIC_BASE_URL = ''
+    monkeypatch.setattr('core.views.signed_url_window', lambda: 1650)
+    assert BrandView().get_cache_timeout() == 1650
+    view = BrandView(request=None, format_kwarg=None)
+    assert view.get_serializer_context()[MEDIA_RESOLVER_CONTEXT_KEY].min_lifetime == 1650
+    settings.MEDIA_PUBLIC_BASE_URL = 'https://cdn.carrentino.ru'
+    assert BrandView().get_cache_timeout() == 86400
+    monkeypatch.setattr('core.views.signed_url_window', lambda: None)
+    settings.MEDIA_PUBLIC_BASE_URL = ''
+    assert BrandView().get_cache_timeout() == 86400
+
+
+def test_catalog_cache_queries(db, client, brand, django_assert_num_queries):
+    rev_url = reverse('cars:brand-detail', args=[brand.pk])
+    client.get(rev_url)
+    with django_assert_num_queries(0):
+        response = client.get(rev_url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['title'] == brand.title
+
+
+@pytest.mark.parametrize('url', ['cars:car-map-view', 'cars:car-list-view'])
+def test_cars_not_modified(url, db, client, car_factory, django_assert_num_queries):
+    '''Повторный запрос с If-None-Match без изменений получает пустой 304'''
+    car = car_factory()
+    rev_url = reverse(url)
+    response = client.get(rev_url)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'Last-Modified' not in response
+    with django_assert_num_queries(1):
+        response = client.get(rev_url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b''
+    etag = response['ETag']
+    car.price += 1
+    car.save()
+    response = client.get(rev_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+
+
+def test_car_retrieve_etag_follows_signed_urls(db, client, car, monkeypatch):
+    '''ETag меняется раз в окно подписи ссылок на фото'''
+    now = 1_000_000
+    monkeypatch.setattr('core.views.signed_url_window', lambda: 1650)
+    monkeypatch.setattr('core.views.time.time', lambda: now)
+    rev_url = reverse('cars:car-detail', args=[car.pk])
+    etag = client.get(rev_url)['ETag']
+    assert client.get(rev_url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+    now += 1650
+    assert client.get(rev_url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+
+def test_car_retrieve_not_modified(db, client, misha, misha_client, car_factory):
+    car = car_factory(owner=misha)
+    rev_url = reverse('cars:car-detail', args=[car.pk])
+    etag = client.get(rev_url)['ETag']
+    assert client.get(rev_url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+    misha_client.post(reverse('cars:car-add-option', args=[car.pk]), data={'option': 'option'})
+    response = client.get(rev_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    etag = response['ETag']
+    car.car_model.title = 'Vesta'
+    car.car_model.save()
+    assert client.get(rev_url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+
+def test_car_retrieve_etag_follows_owner(db, client, misha, car_factory):
+    '''Данные владельца в ответе меняют ETag'''
+    car = car_factory(owner=misha)
+    rev_url = reverse('cars:car-detail', args=[car.pk])
+    etag = client.get(rev_url, {'expand': 'owner'})['ETag']
+    misha.first_name = 'Михаил'
+    misha.save()
+    response = client.get(rev_url, {'expand': 'owner'}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['owner']['first_name'] == 'Михаил'
+
+
+@pytest.mark.parametrize('url', ['cars:car-map-view', 'cars:car-list-view'])
+def test_cars_available_not_conditional(url, db, client, car_factory):
+    '''Доступность зависит от заказов, такие ответы не проверяются по ETag'''
+    car_factory()
+    params = {'available_after': '2030-01-01T10:00:00Z', 'available_before': '2030-01-01T12:00:00Z'}
+    response = client.get(reverse(url), params)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'ETag' not in response
+    response = client.get(reverse(url), params, HTTP_IF_NONE_MATCH='*')
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_catalog_autocomplete(db, client, brand_factory, car_model_factory, django_assert_num_queries):
+    toyota = brand_factory(title='Toyota')
+    brand_factory(title='BMW')
+    car_model_factory(title='Corolla', brand=toyota)
+    camry = car_model_factory(title='Camry', brand=toyota)
+    rev_url = reverse('cars:catalog-autocomplete')
+    response = client.get(rev_url, {'q': 'toyo', 'limit': 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == [
+        {'id': toyota.id, 'title': 'Toyota', 'type': 'brand',
+         'brand_id': toyota.id, 'brand_title': 'Toyota', 'photo': None},
+        {'id': camry.id, 'title': 'Camry', 'type': 'car_model',
+         'brand_id': toyota.id, 'brand_title': 'Toyota', 'photo': None},
+    ]
+    with django_assert_num_queries(0):
+        response = client.get(rev_url, {'q': 'Toyota  cor'})
+    assert [item['title'] for item in response.data] == ['Corolla']
+    response = client.get(rev_url, {'q': 'Toyotta'})
+    assert [item['title'] for item in response.data] == ['Toyota']
+
+
+@pytest.mark.parametrize('query, title', [
+    ('tayota', 'Toyota'),
+    ('Toyata', 'Toyota'),
+    ('mersedes', 'Mercedes-Benz'),
+    ('camri', 'Camry'),
+])
+def test_catalog_autocomplete_typos(query, title, db, client, brand_factory, car_model_factory):
+    '''Опечатки с заменой букв ниже порога word_similarity по умолчанию'''
+    toyota = brand_factory(title='Toyota')
+    brand_factory(title='Mercedes-Benz')
+    car_model_factory(title='Camry', brand=toyota)
+    response = client.get(reverse('cars:catalog-autocomplete'), {'q': query})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data[0]['title'] == title
+
+
+def test_catalog_autocomplete_fallback(db, client, brand_factory, brand_photo_factory):
+    '''Префиксный индекс ничего не нашел, подсказки дает триграммный поиск'''
+    brand = brand_factory(title='Mercedes-Benz')
+    brand_photo_factory(brand=brand)
+    rev_url = reverse('cars:catalog-autocomplete')
+    client.get(rev_url, {'q': 'mer'})
+    assert catalog.catalog_index.get().search('mersedes', 10) == []
+    response = client.get(rev_url, {'q': 'mersedes'})
+    assert [item['id'] for item in response.data] == [brand.id]
+    assert response.data[0]['photo']
+
+
+def test_catalog_autocomplete_refresh(db, client, settings, brand_factory, brand_photo_factory):
+    settings.CATALOG_INDEX_CHECK_INTERVAL = 0
+    rev_url = reverse('cars:catalog-autocomplete')
+    assert client.get(rev_url, {'q': 'lad'}).data == []
+    brand = brand_factory(title='Lada')
+    brand_photo_factory(brand=brand)
+    response = client.get(rev_url, {'q': 'lad'})
+    assert [item['title'] for item in response.data] == ['Lada']
+    assert response.data[0]['photo']
+
+
+def decode_columns(payload):
+    '''Обратное преобразование колоночного формата карты'''
+    columns = {}
+    for key, values in payload['columns'].items():
+        if key in payload['delta']:
+            total = 0
+            decoded = []
+            for value in values:
+                total += value
+                decoded.append(total)
+            values = decoded
+        if key in payload['scaled']:
+            values = [value / 10 ** payload['precision'] for value in values]
+        columns[key] = values
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+@pytest.mark.parametrize('accept', ['application/vnd.carrentino.columnar+json', 'application/x-msgpack'])
+def test_map_view_compact(accept, db, client, user, car_model, car_factory):
+    '''Компактный формат карты декодируется в те же точки и занимает в разы меньше'''
+    for i in range(300):
+        car_factory(owner=user, car_model=car_model, latitude=55.75 + i * 0.0013, longitude=37.61 - i * 0.0007)
+    rev_url = reverse('cars:car-map-view')
+    plain = client.get(rev_url)
+    compact = client.get(rev_url, HTTP_ACCEPT=accept)
+    assert compact.status_code == status.HTTP_200_OK
+    assert compact['Content-Type'].startswith(accept)
+    assert compact['ETag'] != plain['ETag']
+    assert 'Accept' in compact['Vary']
+    if accept == 'application/x-msgpack':
+        payload = msgpack.unpackb(compact.content)
+    else:
+        payload = json.loads(compact.content)
+    points = decode_columns(payload)
+    assert sorted(point['id'] for point in points) == sorted(point['id'] for point in plain.json())
+    expected = {point['id']: point for point in plain.json()}
+    for point in points:
+        assert point['latitude'] == pytest.approx(expected[point['id']]['latitude'], abs=1e-5)
+        assert point['longitude'] == pytest.approx(expected[point['id']]['longitude'], abs=1e-5)
+    assert len(compact.content) * 2 < len(plain.content), (
+        f'json {len(plain.content)} bytes, {accept} {len(compact.content)} bytes')
+
+
+def test_map_view_compact_clusters(db, client, car_factory):
+    car_factory(latitude=55.75, longitude=37.61)
+    response = client.get(reverse('cars:car-map-view'), {'zoom': 3, 'format': 'columnar'})
+    assert response.status_code == status.HTTP_200_OK
+    assert decode_columns(response.json())[0]['count'] == 1
+
+
+@pytest.mark.parametrize('url', ['cars:car-list-view', 'cars:car-user-cars-view'])
+def test_cars_list_stream(url, db, user, user_client, car_model, car_factory, settings):
+    '''Потоковый список совпадает со всеми страницами обычного списка'''
+    settings.STREAMING_CHUNK_SIZE = 3
+    for price in range(10):
+        car_factory(owner=user, car_model=car_model, price=price)
+    rev_url = reverse(url)
+    paginated = user_client.get(rev_url, {'ordering': 'price', 'page_size': 100}).json()['results']
+    response = user_client.get(rev_url, {'ordering': 'price', 'stream': 'true'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    chunks = list(response.streaming_content)
+    assert len(chunks) == 6
+    assert json.loads(b''.join(chunks)) == paginated
+
+
+@pytest.mark.parametrize(
+    'params, keys, queries',
+    [
+        [{}, {'id', 'car_model', 'color', 'score', 'price', 'owner', 'status',
+              'latitude', 'longitude', 'photos', 'options'}, 5],
+        [{'fields': 'id,price'}, {'id', 'price'}, 1],
+        [{'fields': 'id,car_model,photos'}, {'id', 'car_model', 'photos'}, 2],
+        [{'fields': 'id,car_model', 'expand': 'car_model'}, {'id', 'car_model'}, 3],
+        [{'expand': 'owner'}, {'id', 'car_model', 'color', 'score', 'price', 'owner', 'status',
+                               'latitude', 'longitude', 'photos', 'options'}, 3],
+    ]
+)
+def test_car_sparse_fields(params, keys, queries, db, client, car, car_photo_factory, django_assert_num_queries):
+    '''?fields=/?expand= ограничивают ответ и запросы к базе'''
+    photo = car_photo_factory(car=car)
+    rev_url = reverse('cars:car-detail', args=[car.pk])
+    # запрос состояния для ETag, остальное — загрузка автомобиля
+    with django_assert_num_queries(queries + 1):
+        response = client.get(rev_url, params)
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.data) == keys
+    if 'expand' in params or 'fields' in params:
+        expand = params.get('expand', '')
+        if 'car_model' in keys:
+            expected = response.data['car_model']['id'] if 'car_model' in expand else response.data['car_model']
+            assert expected == car.car_model_id
+        if 'photos' in keys and 'photos' not in expand:
+            assert response.data['photos'] == [photo.id]
+        if 'owner' in keys:
+            assert response.data['owner'] == {'id': car.owner.id, 'first_name': car.owner.first_name,
+                                              'last_name': car.owner.last_name, 'email': car.owner.email}
+
+
+def test_car_sparse_fields_unknown(db, client, car):
+    response = client.get(reverse('cars:car-detail', args=[car.pk]), {'fields': 'id,secret'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
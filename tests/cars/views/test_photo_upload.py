@@ -0,0 +1,152 @@
+import base64
+import json
+
+import pytest
+from cars.models import CarPhoto
+from cars.uploads import sign_photo_upload
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+from storages.backends.s3boto3 import S3Boto3Storage
+
+
+@pytest.fixture
+def minio_storage(monkeypatch):
+    '''S3 storage of a local MinIO, presigning does not need the server'''
+    storage = S3Boto3Storage(
+        access_key='minioadmin', secret_key='minioadmin',
+        bucket_name='carrentino', endpoint_url='http://localhost:9000')
+    monkeypatch.setattr('cars.views.photo_storage', lambda: storage)
+    return storage
+
+
+@pytest.fixture
+def local_storage(settings, tmp_path):
+    '''Stand-in of the bucket the client uploaded the photo to'''
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    }
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture
+def own_car(user, car_factory):
+    return car_factory(owner=user)
+
+
+def confirm_photo(client, car, token):
+    return client.post(reverse('cars:car-confirm-photo', args=[car.pk]), {'token': token})
+
+
+def test_upload_photo_form(minio_storage, user_client, own_car):
+    response = user_client.post(
+        reverse('cars:car-upload-photo', args=[own_car.pk]), {'content_type': 'image/png'})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data['url'] == 'http://localhost:9000/carrentino'
+    assert data['fields']['key'].startswith('cars/')
+    assert data['fields']['key'].endswith('.png')
+    assert data['fields']['Content-Type'] == 'image/png'
+    policy = json.loads(base64.b64decode(data['fields']['policy']))
+    assert ['content-length-range', 1, 10 * 1024 * 1024] in policy['conditions']
+    assert data['token']
+    assert not CarPhoto.objects.exists()
+
+
+def test_upload_photo_validation(minio_storage, user_client, misha_client, own_car):
+    url = reverse('cars:car-upload-photo', args=[own_car.pk])
+    response = user_client.post(url, {'content_type': 'application/pdf'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = misha_client.post(url, {'content_type': 'image/jpeg'})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_confirm_photo(local_storage, user_client, own_car):
+    name = default_storage.save('cars/uploaded.jpg', ContentFile(b'photo'))
+    token = sign_photo_upload(own_car.pk, name)
+    response = confirm_photo(user_client, own_car, token)
+    assert response.status_code == status.HTTP_201_CREATED
+    photo = CarPhoto.objects.get(car=own_car)
+    assert response.json()['id'] == photo.pk
+    assert photo.photo.name == name
+    # повторное подтверждение не создает дубль
+    response = confirm_photo(user_client, own_car, token)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert CarPhoto.objects.filter(car=own_car).count() == 1
+
+
+def test_confirm_photo_errors(local_storage, settings, user_client, own_car, car_factory):
+    other_car = car_factory(owner=own_car.owner, car_model=own_car.car_model)
+    name = default_storage.save('cars/large.jpg', ContentFile(b'photo'))
+    for token in [
+        'not a token',
+        sign_photo_upload(other_car.pk, name),
+        sign_photo_upload(own_car.pk, 'cars/missing.jpg'),
+    ]:
+        response = confirm_photo(user_client, own_car, token)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    settings.PHOTO_UPLOAD_MAX_SIZE = 1
+    response = confirm_photo(user_client, own_car, sign_photo_upload(own_car.pk, name))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not default_storage.exists(name)
+    assert not CarPhoto.objects.exists()
+
+
+class BrokenStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if 'broken' in name:
+            raise OSError('storage is down')
+        return super().save(name, content, max_length)
+
+
+def photo_file(name, content_type='image/jpeg', size=10):
+    return SimpleUploadedFile(name, b'x' * size, content_type=content_type)
+
+
+def test_add_photos(local_storage, settings, user_client, own_car, django_capture_on_commit_callbacks):
+    settings.PHOTO_UPLOAD_MAX_SIZE = 100
+    files = [
+        photo_file('front.jpg'),
+        photo_file('back.png', 'image/png'),
+        photo_file('document.pdf', 'application/pdf'),
+        photo_file('huge.jpg', size=101),
+        photo_file('side.webp', 'image/webp'),
+    ]
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = user_client.post(
+            reverse('cars:car-add-photos', args=[own_car.pk]), {'photos': files}, format='multipart')
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert len(data['created']) == 3
+    assert {error['file'] for error in data['errors']} == {'document.pdf', 'huge.jpg'}
+    photos = CarPhoto.objects.filter(car=own_car)
+    assert sorted(photo.pk for photo in photos) == sorted(photo['id'] for photo in data['created'])
+    assert all(default_storage.exists(photo.photo.name) for photo in photos)
+    # bulk_create не вызывает post_save, варианты ставятся в очередь вручную
+    assert len(callbacks) == 3
+
+
+def test_add_photos_storage_error(local_storage, monkeypatch, user_client, own_car):
+    monkeypatch.setattr('cars.views.photo_storage', BrokenStorage)
+    response = user_client.post(
+        reverse('cars:car-add-photos', args=[own_car.pk]),
+        {'photos': [photo_file('front.jpg'), photo_file('broken.jpg')]}, format='multipart')
+    assert response.status_code == status.HTTP_201_CREATED
+    data = response.json()
+    assert len(data['created']) == 1
+    assert data['errors'] == [{'file': 'broken.jpg', 'error': 'Не удалось сохранить файл'}]
+
+
+def test_add_photos_errors(local_storage, user_client, misha_client, own_car):
+    url = reverse('cars:car-add-photos', args=[own_car.pk])
+    response = user_client.post(url, {'photos': [photo_file('a.pdf', 'application/pdf')]}, format='multipart')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert len(response.json()['errors']) == 1
+    response = user_client.post(url, {}, format='multipart')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = misha_client.post(url, {'photos': [photo_file('a.jpg')]}, format='multipart')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert not CarPhoto.objects.exists()
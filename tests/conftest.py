@@ -2,6 +2,7 @@ from unittest.mock import MagicMock
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from pytest_factoryboy import register
 from rest_framework.test import APIClient
@@ -16,6 +17,13 @@ register(cars.CarModelFactory)
 register(cars.CarFactory)
 register(cars.CarOptionFactory)
 register(cars.CarPhotoFactory)
+register(cars.BrandPhotoFactory)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    '''Cached responses must not leak between tests'''
+    cache.clear()
 
 
 @pytest.fixture
@@ -59,3 +59,10 @@ class CarPhotoFactory(factory.django.DjangoModelFactory):
         model = models.CarPhoto
     car = factory.SubFactory(CarFactory)
     photo = factory.django.FileField(name='test_photo.jpg')
+
+
+class BrandPhotoFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = models.BrandPhoto
+    brand = factory.SubFactory(BrandFactory)
+    photo = factory.django.ImageField(filename='test_brand.jpg')
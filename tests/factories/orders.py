@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django.utils import timezone
 
 import factory
@@ -15,8 +17,8 @@ class OrderFactory(factory.django.DjangoModelFactory):
         model = models.Order
     car = factory.SubFactory(CarFactory)
     renter = factory.SubFactory(UserFactory)
-    desired_finish_datetime = factory.LazyFunction(timezone.now)
-    desired_start_datetime = factory.LazyFunction(timezone.now)
+    desired_start_datetime = factory.Sequence(lambda n: timezone.now() - timedelta(days=n + 1))
+    desired_finish_datetime = factory.LazyAttribute(lambda o: o.desired_start_datetime + timedelta(hours=1))
     start_rent_time = factory.LazyFunction(timezone.now)
     finish_datetime = factory.LazyFunction(timezone.now)
     status = factory.Faker('random_element', elements=[choice[0] for choice in models.ORDER_STATUSES])
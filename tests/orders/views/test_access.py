@@ -1,8 +1,11 @@
 from datetime import timedelta
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from orders.choices import ORDER_STATUSES
 from rest_framework import status
 
 from car_rent.cars.choices import CAR_STATUS_CHOICES
@@ -66,3 +69,29 @@ def test_create_order_with_invalid_start_finish_datetime(user_client):
     response = user_client.post(
         reverse("orders:order-list"), data=data_to_send)
     assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    "method, data", [
+        ("get", None),
+        ("patch", {"desired_finish_datetime": timezone.now() + timedelta(days=1)}),
+    ]
+)
+def test_access_foreign_order(user_client, method, data):
+    order = OrderFactory(status=ORDER_STATUSES.UNDER_CONSIDERATION)
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(user_client, method)(
+            reverse("orders:order-detail", kwargs={"pk": order.id}), data=data)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    # аутентификация и один запрос заказа с условием на участника сделки
+    assert len(context.captured_queries) == 2
+
+
+def test_access_order_by_lessor(user_client, user):
+    order = OrderFactory(car=CarFactory(owner=user), status=ORDER_STATUSES.UNDER_CONSIDERATION)
+    response = user_client.get(reverse("orders:order-detail", kwargs={"pk": order.id}))
+    assert response.status_code == status.HTTP_200_OK
+    response = user_client.patch(
+        reverse("orders:order-detail", kwargs={"pk": order.id}),
+        data={"desired_finish_datetime": timezone.now() + timedelta(days=1)})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -1,8 +1,16 @@
+import base64
+import json
+from datetime import timedelta
+from unittest.mock import patch
 
 import pytest
+from cars.models import Car
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from orders import models
+from orders.views import OrderViewSet
 from rest_framework import status
 
 from tests.factories.cars import CarFactory
@@ -18,7 +26,71 @@ def test_list_lessor_orders(user_client, user):
     current_user_orders = OrderFactory.create_batch(3, car=current_user_car)
     response = user_client.get(reverse("orders:order-list-lessor-orders"))
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == len(current_user_orders)
+    assert len(response.data['results']) == len(current_user_orders)
+
+
+@pytest.mark.parametrize(
+    "url, params, count", [
+        ("orders:order-list-lessor-orders", {}, 5),
+        ("orders:order-list-lessor-orders", {'status': [models.ORDER_STATUSES.CANCELED]}, 2),
+        ("orders:order-list-lessor-orders",
+         {'status': [models.ORDER_STATUSES.CANCELED, models.ORDER_STATUSES.FINISHED]}, 5),
+        ("orders:order-list-renter-orders", {}, 5),
+        ("orders:order-list-renter-orders", {'status': [models.ORDER_STATUSES.FINISHED]}, 3),
+    ]
+)
+def test_orders_list_pagination(user_client, user, url, params, count):
+    if url == "orders:order-list-lessor-orders":
+        OrderFactory.create_batch(2, car=CarFactory(owner=user), status=models.ORDER_STATUSES.CANCELED)
+        OrderFactory.create_batch(3, car=CarFactory(owner=user), status=models.ORDER_STATUSES.FINISHED)
+    else:
+        OrderFactory.create_batch(2, renter=user, status=models.ORDER_STATUSES.CANCELED)
+        OrderFactory.create_batch(3, renter=user, status=models.ORDER_STATUSES.FINISHED)
+    OrderFactory.create_batch(2)
+    ids = []
+    next_url, data = reverse(url), {**params, 'page_size': 2}
+    while next_url:
+        response = user_client.get(next_url, data=data)
+        assert response.status_code == status.HTTP_200_OK
+        ids += [order['id'] for order in response.data['results']]
+        next_url, data = response.data['next'], None
+    assert len(ids) == count
+    created = models.Order.objects.filter(id__in=ids).order_by('-created_at', '-id')
+    assert ids == list(created.values_list('id', flat=True))
+
+
+@pytest.mark.parametrize('ordering', ['-created_at', 'created_at'])
+def test_orders_list_pagination_same_millisecond(user_client, user, ordering):
+    orders = OrderFactory.create_batch(4, renter=user)
+    created_at = timezone.now().replace(microsecond=123000)
+    for i, order in enumerate(orders):
+        models.Order.objects.filter(pk=order.pk).update(created_at=created_at + timedelta(microseconds=i * 100))
+    expected = [order.id for order in orders]
+    if ordering.startswith('-'):
+        expected.reverse()
+    ids = []
+    next_url, data = reverse("orders:order-list-renter-orders"), {'ordering': ordering, 'page_size': 1}
+    while next_url and len(ids) <= len(orders):
+        response = user_client.get(next_url, data=data)
+        ids += [order['id'] for order in response.data['results']]
+        next_url, data = response.data['next'], None
+    assert ids == expected
+
+
+@pytest.mark.parametrize('values', [['abc', 1], [None, 1], ['2024-01-01T00:00:00', 'x']])
+def test_orders_list_invalid_cursor_values(user_client, values):
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    response = user_client.get(reverse("orders:order-list-renter-orders"), data={'cursor': cursor})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_lessor_orders_by_car(user_client, user):
+    car, other_car = CarFactory(owner=user), CarFactory(owner=user)
+    OrderFactory.create_batch(2, car=car)
+    OrderFactory(car=other_car)
+    response = user_client.get(reverse("orders:order-list-lessor-orders"), data={'car_id': car.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['results']) == 2
 
 
 def test_renter_orders(user_client, user):
@@ -26,7 +98,7 @@ def test_renter_orders(user_client, user):
     current_user_orders = OrderFactory.create_batch(3, renter=user)
     response = user_client.get(reverse("orders:order-list-renter-orders"))
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == len(current_user_orders)
+    assert len(response.data['results']) == len(current_user_orders)
 
 
 @pytest.mark.parametrize(
@@ -187,3 +259,96 @@ def test_patch_update_order_after_consideration(user_client, user, current_statu
         refresh_order = models.Order.objects.get(id=order.id)
         assert refresh_order.desired_finish_datetime == new_desired_finish_datetime
     assert response_patch.status_code == response_status
+
+
+@pytest.mark.parametrize('method', ['put', 'patch'])
+def test_update_order_accepted_concurrently(user_client, user, method):
+    '''Одобрение между чтением заявки и записью не затирается'''
+    order = OrderFactory(renter=user, set_status=models.ORDER_STATUSES.UNDER_CONSIDERATION)
+    finish = order.desired_finish_datetime
+    get_object = OrderViewSet.get_object
+
+    def accept_after_read(view):
+        obj = get_object(view)
+        models.Order.objects.filter(pk=obj.pk).update(status=models.ORDER_STATUSES.ACCEPTED)
+        return obj
+
+    with patch.object(OrderViewSet, 'get_object', accept_after_read):
+        response = getattr(user_client, method)(
+            reverse("orders:order-detail", kwargs={'pk': order.id}),
+            data={"desired_finish_datetime": finish + timedelta(days=1)})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    order.refresh_from_db()
+    assert order.status == models.ORDER_STATUSES.ACCEPTED
+    assert order.desired_finish_datetime == finish
+
+
+def test_accept_order_overlapping_booked_period(user_client, user):
+    car = CarFactory(owner=user)
+    start = timezone.now() + timedelta(days=1)
+    booked = OrderFactory(car=car, set_status=models.ORDER_STATUSES.UNDER_CONSIDERATION,
+                          desired_start_datetime=start,
+                          desired_finish_datetime=start + timedelta(hours=3))
+    overlapping = OrderFactory(car=car, set_status=models.ORDER_STATUSES.UNDER_CONSIDERATION,
+                               desired_start_datetime=start + timedelta(hours=2),
+                               desired_finish_datetime=start + timedelta(hours=5))
+    adjacent = OrderFactory(car=car, set_status=models.ORDER_STATUSES.UNDER_CONSIDERATION,
+                            desired_start_datetime=start + timedelta(hours=3),
+                            desired_finish_datetime=start + timedelta(hours=4))
+    for order, response_status in [
+        (booked, status.HTTP_200_OK),
+        (overlapping, status.HTTP_409_CONFLICT),
+        (adjacent, status.HTTP_200_OK),
+    ]:
+        response = user_client.post(
+            reverse("orders:order-accept-order", kwargs={'pk': order.id}))
+        assert response.status_code == response_status
+    overlapping.refresh_from_db()
+    assert overlapping.status == models.ORDER_STATUSES.UNDER_CONSIDERATION
+
+
+def test_order_lessor_follows_car_owner(user_client, user):
+    car = CarFactory(owner=user)
+    orders = OrderFactory.create_batch(2, car=car)
+    assert all(order.lessor_id == user.id for order in orders)
+    new_owner = UserFactory()
+    car.owner = new_owner
+    car.save()
+    assert set(models.Order.objects.filter(car=car).values_list('lessor_id', flat=True)) == {new_owner.id}
+    response = user_client.get(reverse("orders:order-list-lessor-orders"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results'] == []
+
+
+def test_order_lessor_untouched_on_car_save(user):
+    car = CarFactory(owner=user)
+    OrderFactory(car=car)
+    car = Car.objects.get(pk=car.pk)
+    car.price += 1
+    with CaptureQueriesContext(connection) as queries:
+        car.save()
+        car.save(update_fields=['price'])
+    assert not any('order_table' in query['sql'] for query in queries)
+    car.owner = UserFactory()
+    with CaptureQueriesContext(connection) as queries:
+        car.save(update_fields=['price'])
+    assert not any('order_table' in query['sql'] for query in queries)
+    car.save()
+    assert models.Order.objects.get(car=car).lessor_id == car.owner_id
+
+
+@pytest.mark.parametrize('url', ["orders:order-list-lessor-orders", "orders:order-list-renter-orders"])
+def test_orders_list_stream(user_client, user, url):
+    if url == "orders:order-list-lessor-orders":
+        OrderFactory.create_batch(3, car=CarFactory(owner=user))
+    else:
+        OrderFactory.create_batch(3, renter=user)
+    paginated = user_client.get(reverse(url)).json()['results']
+    response = user_client.get(reverse(url), {'stream': 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert json.loads(b''.join(response.streaming_content)) == paginated
+
+
+def test_orders_list_stream_empty(user_client):
+    response = user_client.get(reverse("orders:order-list-renter-orders"), {'stream': 1})
+    assert b''.join(response.streaming_content) == b'[]'
@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from orders import models
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tests.factories.cars import CarFactory
+from tests.factories.orders import OrderFactory
+from tests.factories.users import UserFactory
+
+# Запросы на переход статуса: аутентификация пользователя и один
+# условный UPDATE (для одобрения еще SAVEPOINT/RELEASE вокруг него).
+
+
+@pytest.mark.parametrize(
+    "url, current_status, lessor_request, queries", [
+        ("orders:order-accept-order", models.ORDER_STATUSES.UNDER_CONSIDERATION, True, 4),
+        ("orders:order-reject-order", models.ORDER_STATUSES.UNDER_CONSIDERATION, True, 2),
+        ("orders:order-cancel-order", models.ORDER_STATUSES.UNDER_CONSIDERATION, False, 2),
+        ("orders:order-start-rent", models.ORDER_STATUSES.ACCEPTED, True, 2),
+        ("orders:order-start-rent", models.ORDER_STATUSES.ACCEPTED, False, 2),
+    ]
+)
+def test_transition_queries(user_client, user, url, current_status, lessor_request, queries):
+    if lessor_request:
+        order = OrderFactory(car=CarFactory(owner=user), set_status=current_status)
+    else:
+        order = OrderFactory(renter=user, car=CarFactory(owner=UserFactory()), set_status=current_status)
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.post(reverse(url, kwargs={'pk': order.id}))
+    assert response.status_code == status.HTTP_200_OK
+    assert len(context.captured_queries) == queries
+
+
+@pytest.mark.parametrize(
+    "url", [
+        "orders:order-accept-order",
+        "orders:order-reject-order",
+        "orders:order-cancel-order",
+        "orders:order-start-rent",
+    ]
+)
+def test_transition_foreign_order(user_client, url):
+    order = OrderFactory(set_status=models.ORDER_STATUSES.UNDER_CONSIDERATION)
+    response = user_client.post(reverse(url, kwargs={'pk': order.id}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    order.refresh_from_db()
+    assert order.status == models.ORDER_STATUSES.UNDER_CONSIDERATION
+
+
+def test_start_rent_handshake(user_client, user):
+    renter = UserFactory()
+    order = OrderFactory(car=CarFactory(owner=user), renter=renter,
+                         status=models.ORDER_STATUSES.ACCEPTED,
+                         is_renter_start_order=False, is_lessor_start_order=False)
+    response = user_client.post(reverse("orders:order-start-rent", kwargs={'pk': order.id}))
+    assert response.status_code == status.HTTP_200_OK
+    order.refresh_from_db()
+    assert order.is_lessor_start_order is True
+    assert order.is_renter_start_order is False
+    assert order.status == models.ORDER_STATUSES.ACCEPTED
+
+    client = APIClient()
+    client.force_authenticate(renter)
+    response = client.post(reverse("orders:order-start-rent", kwargs={'pk': order.id}))
+    assert response.status_code == status.HTTP_200_OK
+    order.refresh_from_db()
+    assert order.is_renter_start_order is True
+    assert order.status == models.ORDER_STATUSES.IN_PROGRESS